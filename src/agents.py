@@ -2,27 +2,66 @@ from typing import Dict, Any
 import asyncio
 import logging
 import os
-import time
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 from src.base_agent import BaseAgent
-from src.tools import calculate_bollinger_bands, calculate_macd, calculate_obv, calculate_rsi, get_prices, prices_to_df
+from src.streaming_indicators import StreamingIndicatorSet
+from src.columnar import columns_to_frame, frame_to_columns
+from src.market_data_client import market_data_client
 from src.llm_config import llm_config
 
 logger = logging.getLogger(__name__)
 
+# Bars kept in memory per ticker by the market data and quantitative agents
+MAX_BUFFERED_BARS = int(os.getenv('MARKET_DATA_BUFFER_BARS', '1000'))
+# Symbols per multi-symbol bars request
+MARKET_DATA_BATCH_SYMBOLS = int(os.getenv('MARKET_DATA_BATCH_SYMBOLS', '100'))
+
+def bars_by_timestamp(prices: pd.DataFrame) -> pd.DataFrame:
+    """Index bars by timestamp alone, dropping the symbol level of Alpaca's (symbol, timestamp) index."""
+    if isinstance(prices.index, pd.MultiIndex):
+        prices = prices.droplevel(list(range(prices.index.nlevels - 1)))
+    return prices
+
 class MarketDataAgent(BaseAgent):
-    def __init__(self, user_name=None):
-        super().__init__(name="Market Data Agent", user_name=user_name)
+    """
+    Fetches bars for a watchlist and publishes them as per-ticker market_data messages.
+
+    Each refresh groups the watchlist into batches of up to
+    MARKET_DATA_BATCH_SYMBOLS tickers that share a start date and fetches the
+    batches concurrently (the data client bounds how many are in flight).
+    The first fetch for a ticker downloads the configured date range and is
+    published as a "snapshot". After that only bars newer than the ticker's
+    high-water mark are fetched and published, as an "append" message naming
+    the bar it follows ("previous"), so consumers can detect a gap and send a
+    market_data_request for a fresh snapshot. The newest MAX_BUFFERED_BARS
+    bars per ticker are kept to answer those requests.
+    """
+    subscribed_message_types = ("user_message", "chat", "market_data_request")
+    wake_message_types = ("market_data_request",)
+
+    def __init__(self, user_name=None, clock=None, scheduler=None):
+        super().__init__(name="Market Data Agent", user_name=user_name, clock=clock, scheduler=scheduler)
+        # Async price fetchers; replaced by the replay driver to feed historical bars
+        self.price_source = market_data_client.get_prices
+        self.panel_source = market_data_client.get_prices_panel
         self.last_update = 0
         self.update_interval = 300  # 5 minutes
+        self.process_interval = self.update_interval
         # Set default values
         self.market_data = {
-            "ticker": "AAPL",
+            "tickers": ["AAPL"],
             "start_date": "2023-01-01",
             "end_date": "2023-12-31"
         }
+        # Per ticker: timestamp of the newest bar fetched, and the newest bars
+        self.high_water = {}
+        self.bar_buffers = {}
+        self.snapshot_requests = set()
+        # Tickers added since the last fetch
+        self.pending_tickers = set()
 
     async def initialize(self, user_name=None):
         await super().initialize(user_name)
@@ -34,51 +73,263 @@ class MarketDataAgent(BaseAgent):
         )
 
     async def process(self):
-        if time.time() - self.last_update < self.update_interval:
+        # Snapshots are served from the buffer without fetching
+        for ticker in list(self.snapshot_requests):
+            self.snapshot_requests.discard(ticker)
+            if ticker in self.bar_buffers:
+                await self._publish_bars(ticker, self.bar_buffers[ticker], "snapshot")
+
+        # Refresh the whole watchlist when due, otherwise just fetch newly added tickers
+        due = self.clock.time() - self.last_update >= self.update_interval
+        if not due and not self.pending_tickers:
             return
 
         try:
-            await self.broadcast_thought("Fetching market data...")
-            prices = get_prices(self.market_data.get("ticker", "AAPL"), 
-                              self.market_data.get("start_date"),
-                              self.market_data.get("end_date"))
-            
-            if prices is not None:
-                # Convert the DataFrame to a format that can be serialized
-                prices_dict = {
-                    'index': [str(idx) for idx in prices.index],
-                    'data': prices.to_dict('records')
-                }
-                
-                await self.broadcast_message({
-                    "prices": prices_dict,
-                    "timestamp": datetime.now().isoformat()
-                }, "market_data")
-                
-                self.last_update = time.time()
-                await self.broadcast_thought("Market data updated successfully")
+            if due:
+                tickers = list(self.market_data["tickers"])
+            else:
+                tickers = [ticker for ticker in self.market_data["tickers"] if ticker in self.pending_tickers]
+            self.pending_tickers.clear()
+            end_date = self.market_data.get("end_date")
+            await self.broadcast_thought(f"Fetching market data for {len(tickers)} tickers...")
+
+            # Tickers fetched in one request must share a start date
+            groups = {}
+            for ticker in tickers:
+                start_date = self._fetch_start(ticker)
+                if start_date is not None:
+                    groups.setdefault(start_date, []).append(ticker)
+            batches = [
+                (start_date, group[i:i + MARKET_DATA_BATCH_SYMBOLS])
+                for start_date, group in groups.items()
+                for i in range(0, len(group), MARKET_DATA_BATCH_SYMBOLS)
+            ]
+
+            results = await asyncio.gather(
+                *(self._fetch_batch(batch, start_date, end_date) for start_date, batch in batches),
+                return_exceptions=True
+            )
+
+            new_bars = 0
+            failed = []
+            for (_, batch), result in zip(batches, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error fetching market data for {', '.join(batch)}: {result}")
+                    failed.append(result)
+                    self.pending_tickers.update(ticker for ticker in batch if ticker not in self.high_water)
+                    continue
+                for ticker, bars in result.items():
+                    new_bars += await self._update_ticker(ticker, bars)
+
+            if batches and len(failed) == len(batches):
+                # Nothing came back; retry on the next wakeup
+                raise failed[0]
+            if due:
+                self.last_update = self.clock.time()
+            await self.broadcast_thought(f"Market data updated successfully: {new_bars} new bars")
             
         except Exception as e:
             logger.error(f"Error in MarketDataAgent: {e}")
             await self.broadcast_thought(f"Error: {str(e)}")
 
+    def _fetch_start(self, ticker: str):
+        """First date to request for a ticker, or None if every bar in range is already buffered."""
+        high_water = self.high_water.get(ticker)
+        if high_water is None:
+            return self.market_data.get("start_date")
+        # After the first download only ask for the days from the newest bar onwards
+        start_date = high_water.strftime("%Y-%m-%d")
+        end_date = self.market_data.get("end_date")
+        if end_date and start_date >= end_date:
+            return None
+        return start_date
+
+    async def _fetch_batch(self, tickers, start_date: str, end_date: str) -> Dict[str, pd.DataFrame]:
+        """Fetch bars for a batch of tickers and split them by symbol."""
+        if len(tickers) == 1:
+            # Single symbols go through get_prices and its local bar cache
+            prices = await self.price_source(tickers[0], start_date, end_date)
+            return {tickers[0]: bars_by_timestamp(prices)} if prices is not None else {}
+
+        prices = await self.panel_source(tickers, start_date, end_date)
+        if prices is None:
+            return {}
+        return {symbol: bars_by_timestamp(bars) for symbol, bars in prices.groupby(level=0, sort=False)}
+
+    async def _update_ticker(self, ticker: str, bars: pd.DataFrame) -> int:
+        """Buffer and publish the bars newer than the ticker's high-water mark; returns how many there were."""
+        high_water = self.high_water.get(ticker)
+        if high_water is not None:
+            bars = bars[bars.index > high_water]
+        if not len(bars):
+            return 0
+
+        buffer = self.bar_buffers.get(ticker)
+        if buffer is not None:
+            bars_to_keep = pd.concat([buffer, bars])
+        else:
+            bars_to_keep = bars
+        self.bar_buffers[ticker] = bars_to_keep.iloc[-MAX_BUFFERED_BARS:]
+        self.high_water[ticker] = bars.index[-1]
+
+        if high_water is None:
+            await self._publish_bars(ticker, self.bar_buffers[ticker], "snapshot")
+        else:
+            await self._publish_bars(ticker, bars, "append", previous=high_water)
+        return len(bars)
+
+    async def _publish_bars(self, ticker: str, bars: pd.DataFrame, mode: str, previous=None):
+        content = {
+            "ticker": ticker,
+            "mode": mode,
+            "prices": frame_to_columns(bars),
+            "timestamp": self.clock.now().isoformat()
+        }
+        if previous is not None:
+            content["previous"] = str(previous)
+        await self.broadcast_message(content, "market_data")
+
+    def add_tickers(self, tickers):
+        """Add tickers to the watchlist; they are fetched on the next refresh."""
+        watchlist = self.market_data["tickers"]
+        added = [ticker for ticker in dict.fromkeys(tickers) if ticker not in watchlist]
+        watchlist.extend(added)
+        self.pending_tickers.update(added)
+        return added
+
+    def remove_tickers(self, tickers):
+        """Drop tickers from the watchlist along with their buffered bars."""
+        removed = set(tickers)
+        self.market_data["tickers"] = [ticker for ticker in self.market_data["tickers"] if ticker not in removed]
+        self.pending_tickers -= removed
+        for ticker in removed:
+            self.high_water.pop(ticker, None)
+            self.bar_buffers.pop(ticker, None)
+
     async def handle_message(self, message: dict):
         if message["type"] == "user_message":
             content = message["content"]
+            tickers = self.market_data["tickers"]
+            watchlist = ", ".join(tickers[:10]) + (f" and {len(tickers) - 10} more" if len(tickers) > 10 else "")
             await self.broadcast_message({
                 "type": "agent_message",
-                "content": f"I am the Market Data Agent. I'll fetch data for {self.market_data['ticker']} from {self.market_data['start_date']} to {self.market_data['end_date']}"
+                "content": f"I am the Market Data Agent. I'll fetch data for {watchlist} from {self.market_data['start_date']} to {self.market_data['end_date']}"
             })
             
-            if isinstance(content, dict) and "ticker" in content:
-                self.market_data["ticker"] = content["ticker"]
-                self.last_update = 0  # Force update on ticker change
+            if isinstance(content, dict):
+                if "ticker" in content or "tickers" in content:
+                    requested = content.get("tickers") or [content["ticker"]]
+                    if self.add_tickers(requested):
+                        self.wake()
+                if "remove_tickers" in content:
+                    self.remove_tickers(content["remove_tickers"])
+
+        elif message["type"] == "market_data_request":
+            self.snapshot_requests.add(message["content"].get("ticker"))
+
+def bars_fingerprint(bars: pd.DataFrame) -> tuple:
+    """Content hash of a bars frame: changes if any bar, value or timestamp does."""
+    if not len(bars):
+        return (0, None, 0)
+    return (len(bars), bars.index[-1], int(pd.util.hash_pandas_object(bars, index=True).sum()))
+
+def indicator_frame(index, values: dict) -> pd.DataFrame:
+    """
+    Arrange per-bar StreamingIndicatorSet values as indicator columns.
+
+    Args:
+        index: Bar timestamps the values belong to
+        values (dict): Output of StreamingIndicatorSet.update_many
+    """
+    bollinger = np.asarray(values["bollinger_bands"], dtype=float).reshape(-1, 2)
+    macd = np.asarray(values["macd"], dtype=float).reshape(-1, 2)
+    return pd.DataFrame({
+        "bollinger_upper": bollinger[:, 0],
+        "bollinger_lower": bollinger[:, 1],
+        "macd": macd[:, 0],
+        "macd_signal": macd[:, 1],
+        "rsi": np.asarray(values["rsi"], dtype=float),
+        "obv": np.asarray(values["obv"], dtype=float),
+    }, index=index)
+
+def indicator_signals(indicators: pd.DataFrame, price: float) -> list:
+    """MACD, RSI and Bollinger Bands signals from the newest indicator row."""
+    latest = indicators.iloc[-1]
+    signals = []
+
+    # MACD signal
+    macd_diff = latest["macd"] - latest["macd_signal"]
+    signals.append("bullish" if macd_diff > 0 else "bearish")
+
+    # RSI signal
+    rsi_value = latest["rsi"]
+    signals.append("bullish" if rsi_value < 30 else "bearish" if rsi_value > 70 else "neutral")
+
+    # Bollinger Bands signal
+    bb_upper, bb_lower = latest["bollinger_upper"], latest["bollinger_lower"]
+    bb_position = (price - (bb_upper + bb_lower)/2) / (bb_upper - bb_lower)
+    signals.append("bullish" if bb_position < -1 else "bearish" if bb_position > 1 else "neutral")
+
+    return signals
+
+def warm_start_indicators(df: pd.DataFrame, spec=None) -> tuple:
+    """
+    Streaming indicator state and per-bar indicator values for a bars snapshot.
+
+    Equivalent to StreamingIndicatorSet.from_history, but keeps the values
+    for every bar. Module-level so QuantitativeAgent can run it in a worker
+    process.
+
+    Args:
+        df (pd.DataFrame): Bars indexed by timestamp
+        spec (dict, optional): Indicator parameters, as for compute_indicators
+
+    Returns:
+        tuple: (StreamingIndicatorSet, pd.DataFrame of indicator columns)
+    """
+    indicator_set = StreamingIndicatorSet(spec)
+    return indicator_set, indicator_frame(df.index, indicator_set.update_many(df))
 
 class QuantitativeAgent(BaseAgent):
-    def __init__(self, user_name=None):
-        super().__init__(name="Quantitative Agent", user_name=user_name)
+    """
+    Computes technical indicators and signals for every ticker with market data.
+
+    Each technical_analysis message carries the signals, the latest value of
+    every indicator and only the indicator rows added since the previous
+    message for that ticker ("previous" is the bar time, in epoch seconds, of
+    the last row sent before). Full series are not broadcast: an
+    indicator_request naming a ticker, and optionally "since" (epoch seconds),
+    is answered with an indicator_series message built from the cached
+    series of the latest analysis.
+
+    Indicators are kept as streaming state per ticker: a snapshot warm-starts
+    it over the whole history in the compute pool, and appended bars are
+    absorbed in O(1) per bar instead of recomputing over the buffer.
+    """
+    subscribed_message_types = ("user_message", "chat", "market_data", "indicator_request")
+    wake_message_types = ("market_data",)
+
+    def __init__(self, user_name=None, clock=None, scheduler=None):
+        super().__init__(name="Quantitative Agent", user_name=user_name, clock=clock, scheduler=scheduler)
+        # Bars per ticker, rebuilt from market_data snapshots and appends
+        self.price_history = {}
+        self.updated_tickers = set()
+        # Indicator series from the latest analysis per ticker, and the bar time
+        # (epoch seconds) of the last row broadcast
+        self.indicator_cache = {}
+        self.published_through = {}
+        self._full_series = {}
+        # Streaming indicator state per ticker as (spec, StreamingIndicatorSet),
+        # bars appended since it was last updated, and tickers whose state must
+        # be rebuilt from the full history (new snapshot)
+        self.streaming_indicators = {}
+        self.pending_bars = {}
+        self.rebuild_tickers = set()
+        # Indicator parameters, in the compute_indicators format; None uses the defaults
+        self.indicator_spec = None
         self.last_analysis = 0
         self.analysis_interval = 300  # Analyze every 5 minutes
+        self.process_interval = self.analysis_interval
 
     async def initialize(self, user_name=None):
         await super().initialize(user_name)
@@ -90,72 +341,61 @@ class QuantitativeAgent(BaseAgent):
         )
 
     async def process(self):
-        if time.time() - self.last_analysis < self.analysis_interval:
+        # Tickers updated while a previous pass was running are not held back by the interval
+        if not self.updated_tickers and self.clock.time() - self.last_analysis < self.analysis_interval:
             return
 
         try:
-            await self.broadcast_thought("Analyzing market data...")
-            if "prices" in self.state:
-                # Reconstruct DataFrame from the serialized format
-                prices_data = self.state["prices"]
-                
-                # Extract and parse the data correctly
-                df_data = prices_data['data']
-                
-                # Convert to DataFrame with correct datetime index
-                df = pd.DataFrame(df_data)
-                
-                # Handle complex index parsing
-                def parse_index(idx):
-                    # If index is a tuple, extract the timestamp
-                    if isinstance(idx, tuple):
-                        return idx[1]
-                    return idx
-                
-                df.index = pd.to_datetime([parse_index(idx) for idx in prices_data['index']])
-                
-                # Calculate technical indicators
-                bb_upper, bb_lower = calculate_bollinger_bands(df)
-                macd_line, signal_line = calculate_macd(df)
-                rsi = calculate_rsi(df)
-                obv = calculate_obv(df)
-                
-                # Generate signals
-                signals = []
-                
-                # MACD signal
-                macd_diff = macd_line.iloc[-1] - signal_line.iloc[-1]
-                signals.append("bullish" if macd_diff > 0 else "bearish")
-                
-                # RSI signal
-                rsi_value = rsi.iloc[-1]
-                signals.append("bullish" if rsi_value < 30 else "bearish" if rsi_value > 70 else "neutral")
-                
-                # Bollinger Bands signal
-                price = df["close"].iloc[-1]
-                bb_position = (price - (bb_upper.iloc[-1] + bb_lower.iloc[-1])/2) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
-                signals.append("bullish" if bb_position < -1 else "bearish" if bb_position > 1 else "neutral")
-                
-                analysis = {
-                    "signals": signals,
-                    "indicators": {
-                        "bollinger_bands": {
-                            "upper": bb_upper.to_dict(),
-                            "lower": bb_lower.to_dict()
-                        },
-                        "macd": {
-                            "macd": macd_line.to_dict(),
-                            "signal": signal_line.to_dict()
-                        },
-                        "rsi": rsi.to_dict(),
-                        "obv": obv.to_dict(),
-                    },
-                    "timestamp": datetime.now().isoformat()
-                }
-                
-                await self.broadcast_message(analysis, "technical_analysis")
-                self.last_analysis = time.time()
-                await self.broadcast_thought("Technical analysis completed")
+            # Tickers with new bars, or all of them on the periodic refresh
+            tickers = sorted(self.updated_tickers or self.price_history)
+            self.updated_tickers.clear()
+            self.last_analysis = self.clock.time()
+
+            # Same bars and parameters as the last analysis: it still stands and was already sent
+            fingerprints = {
+                ticker: (bars_fingerprint(self.price_history[ticker]), self.indicator_spec)
+                for ticker in tickers
+            }
+            tickers = [ticker for ticker in tickers if not self.inputs_unchanged(ticker, fingerprints[ticker])]
+            if tickers:
+                await self.broadcast_thought("Analyzing market data...")
+                rebuild = [ticker for ticker in tickers if self._needs_rebuild(ticker)]
+                for ticker in rebuild:
+                    # Bars appended while the rebuild runs are applied on the next pass
+                    self.rebuild_tickers.discard(ticker)
+                    self.pending_bars.pop(ticker, None)
+                # Warm starts are independent; they run concurrently off the event loop
+                warm_starts = await asyncio.gather(
+                    *(self.run_compute(warm_start_indicators, self.price_history[ticker], self.indicator_spec)
+                      for ticker in rebuild),
+                    return_exceptions=True
+                )
+                analyses = dict(zip(rebuild, warm_starts))
+
+                for ticker in tickers:
+                    analysis = analyses.get(ticker)
+                    if isinstance(analysis, Exception):
+                        logger.error(f"Error analyzing {ticker}: {analysis}")
+                        continue
+                    if analysis is not None:
+                        indicator_set, indicators = analysis
+                        self.streaming_indicators[ticker] = (self.indicator_spec, indicator_set)
+                    else:
+                        try:
+                            indicators = self._update_indicators(ticker)
+                        except Exception as e:
+                            logger.error(f"Error analyzing {ticker}: {e}")
+                            # Rebuilt from the full history on the next pass
+                            self.streaming_indicators.pop(ticker, None)
+                            continue
+                    price = self.price_history[ticker]["close"].iloc[-1]
+                    await self._publish_analysis(ticker, {
+                        "signals": indicator_signals(indicators, price),
+                        "indicators": indicators,
+                    })
+                    self.record_inputs(ticker, fingerprints[ticker])
+
+                await self.broadcast_thought(f"Technical analysis completed for {len(tickers)} tickers")
                 
         except Exception as e:
             logger.error(f"Error in QuantitativeAgent: {e}", exc_info=True)
@@ -169,14 +409,113 @@ class QuantitativeAgent(BaseAgent):
             })
             
         elif message["type"] == "market_data":
-            self.state["prices"] = message["content"]["prices"]
-            self.last_analysis = 0  # Force analysis on new data
+            if await self._merge_bars(message["content"]):
+                self.updated_tickers.add(message["content"]["ticker"])
+                self.last_analysis = 0  # Force analysis on new data
+
+        elif message["type"] == "indicator_request":
+            await self._send_indicator_series(message["content"])
+
+    def _needs_rebuild(self, ticker: str) -> bool:
+        state = self.streaming_indicators.get(ticker)
+        return ticker in self.rebuild_tickers or state is None or state[0] != self.indicator_spec
+
+    def _update_indicators(self, ticker: str) -> pd.DataFrame:
+        """Absorb the ticker's appended bars into its streaming indicators."""
+        bars = self.pending_bars.pop(ticker, None)
+        indicators = self.indicator_cache[ticker]
+        if bars is None or not len(bars):
+            return indicators
+        _, indicator_set = self.streaming_indicators[ticker]
+        rows = indicator_frame(bars.index, indicator_set.update_many(bars))
+        return pd.concat([indicators, rows]).iloc[-MAX_BUFFERED_BARS:]
+
+    async def _publish_analysis(self, ticker: str, analysis: dict):
+        """Broadcast signals, latest values and the indicator rows not sent yet."""
+        indicators = analysis["indicators"]
+        self.indicator_cache[ticker] = indicators
+        self._full_series.pop(ticker, None)
+
+        previous = self.published_through.get(ticker)
+        if previous is None:
+            # The first message for a ticker carries just the newest row
+            new_rows = indicators.iloc[-1:]
+        else:
+            new_rows = indicators[indicators.index > pd.Timestamp(previous, unit="s", tz="UTC")]
+        if len(indicators):
+            self.published_through[ticker] = int(indicators.index[-1].timestamp())
+
+        await self.broadcast_message({
+            "ticker": ticker,
+            "signals": analysis["signals"],
+            "latest": {name: float(value) for name, value in indicators.iloc[-1].items()} if len(indicators) else {},
+            "indicators": frame_to_columns(new_rows),
+            "previous": previous,
+            "through": self.published_through.get(ticker),
+            "timestamp": self.clock.now().isoformat()
+        }, "technical_analysis")
+
+    async def _send_indicator_series(self, request: dict):
+        """Answer an indicator_request from the cached series of the latest analysis."""
+        ticker = request.get("ticker")
+        indicators = self.indicator_cache.get(ticker)
+        if indicators is None:
+            return
+
+        since = request.get("since")
+        if since is None:
+            # Encoded once per analysis, however many clients ask
+            if ticker not in self._full_series:
+                self._full_series[ticker] = frame_to_columns(indicators)
+            series = self._full_series[ticker]
+        else:
+            series = frame_to_columns(indicators[indicators.index > pd.Timestamp(since, unit="s", tz="UTC")])
+
+        await self.broadcast_message({
+            "ticker": ticker,
+            "since": since,
+            "indicators": series,
+            "through": self.published_through.get(ticker),
+            "timestamp": self.clock.now().isoformat()
+        }, "indicator_series")
+
+    async def _merge_bars(self, content: dict) -> bool:
+        """
+        Apply a market_data snapshot or append to the ticker's bar history.
+
+        Returns:
+            bool: False if bars were missed; a fresh snapshot has been requested
+        """
+        ticker = content["ticker"]
+        bars = columns_to_frame(content["prices"])
+        if content.get("mode") == "append":
+            history = self.price_history.get(ticker)
+            previous = content.get("previous")
+            if history is None or previous is None or history.index[-1] != pd.Timestamp(previous):
+                # Joined late or missed an update; ask for the buffered bars
+                await self.broadcast_message({"ticker": ticker}, "market_data_request")
+                return False
+            pending = self.pending_bars.get(ticker)
+            self.pending_bars[ticker] = bars if pending is None else pd.concat([pending, bars])
+            bars = pd.concat([history, bars])
+        else:
+            self.rebuild_tickers.add(ticker)
+            self.pending_bars.pop(ticker, None)
+        self.price_history[ticker] = bars.iloc[-MAX_BUFFERED_BARS:]
+        return True
 
 class RiskManagementAgent(BaseAgent):
-    def __init__(self, user_name=None):
-        super().__init__(name="Risk Management Agent", user_name=user_name)
+    subscribed_message_types = ("user_message", "chat", "technical_analysis")
+    wake_message_types = ("technical_analysis",)
+
+    def __init__(self, user_name=None, clock=None, scheduler=None):
+        super().__init__(name="Risk Management Agent", user_name=user_name, clock=clock, scheduler=scheduler)
+        # Latest technical analysis per ticker, and the tickers it changed for
+        self.analyses = {}
+        self.updated_tickers = set()
         self.last_assessment = 0
         self.assessment_interval = 300  # Assess every 5 minutes
+        self.process_interval = self.assessment_interval
 
     async def initialize(self, user_name=None):
         await super().initialize(user_name)
@@ -188,13 +527,28 @@ class RiskManagementAgent(BaseAgent):
         )
 
     async def process(self):
-        if time.time() - self.last_assessment < self.assessment_interval:
+        # Tickers updated while a previous pass was running are not held back by the interval
+        if not self.updated_tickers and self.clock.time() - self.last_assessment < self.assessment_interval:
             return
 
         try:
+            tickers = list(self.updated_tickers or self.analyses)
+            self.updated_tickers.clear()
+            self.last_assessment = self.clock.time()
+
+            # An assessment depends only on the analysed bar and its signals
+            fingerprints = {
+                ticker: (self.analyses[ticker].get("through"), tuple(self.analyses[ticker]["signals"]))
+                for ticker in tickers
+            }
+            tickers = [ticker for ticker in tickers if not self.inputs_unchanged(ticker, fingerprints[ticker])]
+            if not tickers:
+                return
+
             await self.broadcast_thought("Assessing portfolio risk...")
-            if "technical_analysis" in self.state:
-                analysis = self.state["technical_analysis"]
+            levels = []
+            for ticker in tickers:
+                analysis = self.analyses[ticker]
                 signals = analysis["signals"]
                 
                 # Simple risk scoring
@@ -212,15 +566,19 @@ class RiskManagementAgent(BaseAgent):
                     max_position = 0.1   # 10% max position
                 
                 assessment = {
+                    "ticker": ticker,
+                    "through": analysis.get("through"),
                     "risk_level": risk_level,
                     "max_position_size": max_position,
                     "stop_loss": 0.02,  # 2% stop loss
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": self.clock.now().isoformat()
                 }
                 
                 await self.broadcast_message(assessment, "risk_assessment")
-                self.last_assessment = time.time()
-                await self.broadcast_thought(f"Risk assessment completed: {risk_level} risk")
+                self.record_inputs(ticker, fingerprints[ticker])
+                levels.append(f"{ticker}: {risk_level}" if ticker else risk_level)
+
+            await self.broadcast_thought(f"Risk assessment completed: {', '.join(levels[:10])} risk")
                 
         except Exception as e:
             logger.error(f"Error in RiskManagementAgent: {e}")
@@ -234,14 +592,24 @@ class RiskManagementAgent(BaseAgent):
             })
             
         elif message["type"] == "technical_analysis":
-            self.state["technical_analysis"] = message["content"]
+            ticker = message["content"].get("ticker")
+            self.analyses[ticker] = message["content"]
+            self.updated_tickers.add(ticker)
             self.last_assessment = 0  # Force assessment on new analysis
 
 class PortfolioManagementAgent(BaseAgent):
-    def __init__(self, user_name=None):
-        super().__init__(name="Portfolio Management Agent", user_name=user_name)
+    subscribed_message_types = ("user_message", "chat", "technical_analysis", "risk_assessment")
+    wake_message_types = ("risk_assessment",)
+
+    def __init__(self, user_name=None, clock=None, scheduler=None):
+        super().__init__(name="Portfolio Management Agent", user_name=user_name, clock=clock, scheduler=scheduler)
+        # Latest analysis and risk assessment per ticker, and the tickers with a new assessment
+        self.analyses = {}
+        self.risk_assessments = {}
+        self.updated_tickers = set()
         self.last_decision = 0
         self.decision_interval = 300  # Make decisions every 5 minutes
+        self.process_interval = self.decision_interval
 
     async def initialize(self, user_name=None):
         await super().initialize(user_name)
@@ -253,14 +621,26 @@ class PortfolioManagementAgent(BaseAgent):
         )
 
     async def process(self):
-        if time.time() - self.last_decision < self.decision_interval:
+        # Tickers updated while a previous pass was running are not held back by the interval
+        if not self.updated_tickers and self.clock.time() - self.last_decision < self.decision_interval:
             return
 
         try:
+            tickers = [ticker for ticker in (self.updated_tickers or self.risk_assessments) if ticker in self.analyses]
+            self.updated_tickers.difference_update(tickers)
+            self.last_decision = self.clock.time()
+
+            # Same analysed bar, signals and risk limits as the last decision: it still stands
+            fingerprints = {ticker: self._decision_inputs(ticker) for ticker in tickers}
+            tickers = [ticker for ticker in tickers if not self.inputs_unchanged(ticker, fingerprints[ticker])]
+            if not tickers:
+                return
+
             await self.broadcast_thought("Making trading decisions...")
-            if all(k in self.state for k in ["technical_analysis", "risk_assessment"]):
-                analysis = self.state["technical_analysis"]
-                risk = self.state["risk_assessment"]
+            actions = []
+            for ticker in tickers:
+                analysis = self.analyses[ticker]
+                risk = self.risk_assessments[ticker]
                 
                 signals = analysis["signals"]
                 bullish_count = signals.count("bullish")
@@ -277,21 +657,30 @@ class PortfolioManagementAgent(BaseAgent):
                     reason = "Mixed signals or neutral risk"
                 
                 decision = {
+                    "ticker": ticker,
                     "action": action,
                     "reason": reason,
                     "max_position_size": risk["max_position_size"],
                     "stop_loss": risk["stop_loss"],
-                    "timestamp": datetime.now().isoformat()
+                    "timestamp": self.clock.now().isoformat()
                 }
                 
                 await self.broadcast_message(decision, "trading_decision")
-                self.last_decision = time.time()
-                await self.broadcast_thought(f"Trading decision made: {action}")
+                self.record_inputs(ticker, fingerprints[ticker])
+                actions.append(f"{ticker}: {action}" if ticker else action)
+
+            await self.broadcast_thought(f"Trading decision made: {', '.join(actions[:10])}")
                 
         except Exception as e:
             logger.error(f"Error in PortfolioManagementAgent: {e}")
             await self.broadcast_thought(f"Error: {str(e)}")
 
+    def _decision_inputs(self, ticker) -> tuple:
+        analysis = self.analyses[ticker]
+        risk = self.risk_assessments[ticker]
+        return (analysis.get("through"), tuple(analysis["signals"]), risk.get("through"),
+                risk["risk_level"], risk["max_position_size"], risk["stop_loss"])
+
     async def handle_message(self, message: dict):
         if message["type"] == "user_message":
             await self.broadcast_message({
@@ -300,9 +689,11 @@ class PortfolioManagementAgent(BaseAgent):
             })
             
         elif message["type"] == "technical_analysis":
-            self.state["technical_analysis"] = message["content"]
+            self.analyses[message["content"].get("ticker")] = message["content"]
         elif message["type"] == "risk_assessment":
-            self.state["risk_assessment"] = message["content"]
+            ticker = message["content"].get("ticker")
+            self.risk_assessments[ticker] = message["content"]
+            self.updated_tickers.add(ticker)
             self.last_decision = 0  # Force decision on new risk assessment
 
 if __name__ == "__main__":
@@ -1,22 +1,191 @@
 from datetime import datetime, timedelta
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
 import logging
 
-from src.tools import get_price_data
-from src.agents import run_hedge_fund
+from src.performance import PerformanceAccumulator, save_performance_plot
+from src.tools import compute_indicators, get_price_data
+
+LOOKBACK_DAYS = 30
+
+# Risk level -> max position size, as set by RiskManagementAgent
+RISK_MAX_POSITION = {"high": 0.05, "medium": 0.1, "low": 0.15}
+
+# Tunable parameters of the rule-based strategy; defaults match the agents.
+# Buys only happen at low risk, so max_position_size is the low-risk size.
+# The agents do not enforce stop_loss, so it is off unless set.
+DEFAULT_STRATEGY_PARAMS = {
+    "rsi_period": 14,
+    "bb_window": 20,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "max_position_size": RISK_MAX_POSITION["low"],
+    "stop_loss": None,
+}
+
+def strategy_indicator_spec(params):
+    """Build a compute_indicators spec from strategy parameters."""
+    return {
+        "macd": {"fast": params["macd_fast"], "slow": params["macd_slow"], "signal": params["macd_signal"]},
+        "rsi": {"period": params["rsi_period"]},
+        "bollinger_bands": {"window": params["bb_window"]},
+    }
+
+def _ffill(values):
+    """Forward-fill NaNs along the last axis of a 1-D or 2-D array."""
+    filled = pd.DataFrame(np.atleast_2d(values).T).ffill().to_numpy().T
+    return filled.reshape(values.shape)
+
+def signal_counts_from_indicators(indicators, price):
+    """
+    Apply the QuantitativeAgent signal rules to precomputed indicators.
+
+    Works on 1-D (time) or 2-D (symbols x time) inputs, as returned by
+    compute_indicators or compute_panel_indicators.
+
+    Returns:
+        tuple: (bullish_count, bearish_count) integer arrays shaped like price
+    """
+    macd_line, signal_line = (np.asarray(s, dtype=float) for s in indicators["macd"])
+    rsi = np.asarray(indicators["rsi"], dtype=float)
+    bb_upper, bb_lower = (np.asarray(s, dtype=float) for s in indicators["bollinger_bands"])
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        bb_position = (price - (bb_upper + bb_lower) / 2) / (bb_upper - bb_lower)
+
+    # NaN comparisons are False, matching the agent's scalar if/else chains
+    macd_bullish = (macd_line - signal_line) > 0
+    bullish = macd_bullish.astype(int) + (rsi < 30) + (bb_position < -1)
+    bearish = (~macd_bullish).astype(int) + (rsi > 70) + (bb_position > 1)
+    return bullish, bearish
+
+def rule_signal_counts(prices_df, spec=None):
+    """
+    Evaluate the QuantitativeAgent signal rules for every bar at once.
+
+    Args:
+        prices_df (pd.DataFrame): Price history with a 'close' column
+        spec (dict, optional): Indicator parameters, see strategy_indicator_spec
+
+    Returns:
+        tuple: (bullish_count, bearish_count) integer arrays, one entry per bar
+    """
+    spec = spec or strategy_indicator_spec(DEFAULT_STRATEGY_PARAMS)
+    indicators = compute_indicators(prices_df, spec)
+    return signal_counts_from_indicators(indicators, prices_df["close"].to_numpy(dtype=float))
+
+def rule_target_weights(bullish, bearish, max_position_size=None):
+    """
+    Apply the RiskManagementAgent and PortfolioManagementAgent rules to signal counts.
+
+    A buy targets the risk-based max position size as a fraction of portfolio
+    value, a sell closes the position and a hold keeps the previous target.
+    Inputs may be 1-D (time) or 2-D (symbols x time).
+
+    Args:
+        max_position_size (float, optional): Override for the low-risk position size
+
+    Returns:
+        tuple: (actions, target_weights) arrays shaped like the inputs
+    """
+    sizes = dict(RISK_MAX_POSITION)
+    if max_position_size is not None:
+        sizes["low"] = max_position_size
+    risk_level = np.where(bearish > bullish, "high", np.where(bullish > bearish, "low", "medium"))
+    max_position = np.select(
+        [risk_level == "high", risk_level == "low"],
+        [sizes["high"], sizes["low"]],
+        sizes["medium"]
+    )
+    buy = (bullish > bearish) & (risk_level != "high")
+    sell = ~buy & ((bearish > bullish) | (risk_level == "high"))
+    actions = np.where(buy, "buy", np.where(sell, "sell", "hold"))
+
+    targets = np.where(buy, max_position, np.where(sell, 0.0, np.nan))
+    target_weights = np.nan_to_num(_ffill(targets), nan=0.0)
+    return actions, target_weights
+
+def apply_stop_loss(target_weights, prices, stop_loss):
+    """
+    Close positions whose price falls stop_loss below the entry price.
+
+    A position's entry is the first bar of a run of non-zero target weights.
+    Once stopped, the weight stays at zero until that run ends. Inputs may be
+    1-D (time) or 2-D (symbols x time).
+    """
+    if not stop_loss or prices.shape[-1] == 0:
+        return target_weights
+    invested = target_weights > 0
+    previous = np.concatenate([np.zeros(invested.shape[:-1] + (1,), dtype=bool), invested[..., :-1]], axis=-1)
+    entries = invested & ~previous
+    # Offset each symbol's run ids so runs never collide across rows
+    row_offset = np.arange(np.atleast_2d(entries).shape[0]).reshape(-1, 1) * (entries.shape[-1] + 1)
+    run_id = (np.cumsum(np.atleast_2d(entries), axis=-1) + row_offset).ravel()
+    entry_price = _ffill(np.where(entries, prices, np.nan))
+    hit = invested & (prices <= entry_price * (1 - stop_loss))
+    stopped = pd.Series(np.atleast_2d(hit).ravel()).groupby(run_id).cummax().to_numpy()
+    return np.where(stopped.reshape(hit.shape), 0.0, target_weights)
 
 class Backtester:
-    def __init__(self, agent, ticker, start_date, end_date, initial_capital):
+    def __init__(self, agent, ticker, start_date, end_date, initial_capital, preload=False, strategy_params=None,
+                 record_history=True):
+        """
+        Args:
+            agent (Callable): Called each day with ticker, start_date, end_date and
+                portfolio; in preload mode it also receives the lookback window as
+                a prices DataFrame.
+            preload (bool, optional): Load the full range plus warm-up once instead
+                of fetching prices for every simulated day.
+            strategy_params (dict, optional): Overrides for DEFAULT_STRATEGY_PARAMS,
+                used by run_vectorized_backtest.
+            record_history (bool, optional): Keep every day's portfolio value for
+                analyze_performance and plotting. Metrics are always tracked
+                incrementally in self.metrics.
+        """
         self.agent = agent
         self.ticker = ticker
         self.start_date = start_date
         self.end_date = end_date
         self.initial_capital = initial_capital
+        self.preload = preload
+        self.strategy_params = {**DEFAULT_STRATEGY_PARAMS, **(strategy_params or {})}
         self.portfolio = {"cash": initial_capital, "stock": 0}
+        self.record_history = record_history
         self.portfolio_values = []
+        self.metrics = PerformanceAccumulator(initial_capital)
         self.logger = logging.getLogger(__name__)
+        self._history = None
+        self._timestamps = None
+        self._closes = None
+
+    def load_history(self):
+        """Fetch the full backtest range plus the lookback warm-up in one request."""
+        warmup_start = (pd.Timestamp(self.start_date) - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        self.set_history(get_price_data(self.ticker, warmup_start, self.end_date))
+
+    def set_history(self, history):
+        """Use an already loaded price history (range plus warm-up) instead of fetching it."""
+        # A single consolidated float block lets row slices be views, not copies
+        self._history = history.astype(float)
+        index = history.index.get_level_values(-1) if isinstance(history.index, pd.MultiIndex) else history.index
+        index = pd.DatetimeIndex(index)
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        self._timestamps = index.tz_convert("UTC").asi8
+        self._closes = np.ascontiguousarray(self._history["close"].to_numpy())
+
+    def price_window(self, start_date, end_date):
+        """
+        Return the preloaded bars in [start_date, end_date] as a view, with the same
+        inclusive bounds as a get_price_data request for that range.
+        """
+        lo = np.searchsorted(self._timestamps, pd.Timestamp(start_date, tz="UTC").value, side="left")
+        hi = np.searchsorted(self._timestamps, pd.Timestamp(end_date, tz="UTC").value, side="right")
+        if hi <= lo:
+            raise ValueError(f"No price data returned for {self.ticker}")
+        return self._history.iloc[lo:hi], self._closes[hi - 1]
 
     def parse_action(self, agent_output):
         try:
@@ -60,20 +229,34 @@ class Backtester:
         self.logger.info(f"{'Date':<12} {'Ticker':<6} {'Action':<6} {'Quantity':>8} {'Price':>8} {'Cash':>12} {'Stock':>8} {'Total Value':>12}")
         self.logger.info("-" * 70)
 
+        if self.preload and self._history is None:
+            self.load_history()
+
         for current_date in dates:
-            lookback_start = (current_date - timedelta(days=30)).strftime("%Y-%m-%d")
+            lookback_start = (current_date - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
             current_date_str = current_date.strftime("%Y-%m-%d")
 
-            agent_output = self.agent(
-                ticker=self.ticker,
-                start_date=lookback_start,
-                end_date=current_date_str,
-                portfolio=self.portfolio
-            )
+            if self.preload:
+                window, current_price = self.price_window(lookback_start, current_date_str)
+                agent_output = self.agent(
+                    ticker=self.ticker,
+                    start_date=lookback_start,
+                    end_date=current_date_str,
+                    portfolio=self.portfolio,
+                    prices=window
+                )
+                action, quantity = self.parse_action(agent_output)
+            else:
+                agent_output = self.agent(
+                    ticker=self.ticker,
+                    start_date=lookback_start,
+                    end_date=current_date_str,
+                    portfolio=self.portfolio
+                )
 
-            action, quantity = self.parse_action(agent_output)
-            df = get_price_data(self.ticker, lookback_start, current_date_str)
-            current_price = df.iloc[-1]['close']
+                action, quantity = self.parse_action(agent_output)
+                df = get_price_data(self.ticker, lookback_start, current_date_str)
+                current_price = df.iloc[-1]['close']
 
             # Execute the trade with validation
             executed_quantity = self.execute_trade(action, quantity, current_price)
@@ -89,41 +272,105 @@ class Backtester:
             )
 
             # Record the portfolio value
-            self.portfolio_values.append(
-                {"Date": current_date, "Portfolio Value": total_value}
+            self.metrics.update(
+                total_value,
+                position_value=self.portfolio["stock"] * current_price,
+                traded_value=executed_quantity * current_price
             )
+            if self.record_history:
+                self.portfolio_values.append(
+                    {"Date": current_date, "Portfolio Value": total_value}
+                )
 
-    def analyze_performance(self):
-        # Convert portfolio values to DataFrame
-        performance_df = pd.DataFrame(self.portfolio_values).set_index("Date")
+    def run_vectorized_backtest(self):
+        """
+        Evaluate the rule-based agent stack over the whole price history with NumPy.
 
-        # Calculate total return
-        final_value = performance_df["Portfolio Value"].iloc[-1]
-        total_return = (final_value - self.initial_capital) / self.initial_capital
-        self.logger.info(f"Total Return: {total_return * 100:.2f}%")
+        Indicators, signals, risk levels and decisions are computed as arrays,
+        then portfolio value compounds with a cumulative product of the held
+        fraction of each bar's return. Target weights stay within [0, 1], so
+        cash never goes negative and no more stock is sold than is held, the
+        same constraints Backtester.execute_trade enforces. Positions are
+        fractional and rebalanced to the target weight at each close.
 
-        # Plot the portfolio value over time
-        performance_df["Portfolio Value"].plot(
-            title="Portfolio Value Over Time", figsize=(12, 6)
-        )
-        plt.ylabel("Portfolio Value ($)")
-        plt.xlabel("Date")
-        plt.show()
+        Returns:
+            pd.DataFrame: Per-day action, target weight, cash, stock and portfolio value
+        """
+        if self._history is None:
+            self.load_history()
 
-        # Compute daily returns
-        performance_df["Daily Return"] = performance_df["Portfolio Value"].pct_change()
+        params = self.strategy_params
+        bullish, bearish = rule_signal_counts(self._history, strategy_indicator_spec(params))
+        actions, weights = rule_target_weights(bullish, bearish, params["max_position_size"])
+
+        # Only trade inside the requested range; earlier bars are warm-up
+        start_ns = pd.Timestamp(self.start_date, tz="UTC").value
+        end_ns = pd.Timestamp(self.end_date, tz="UTC").value
+        lo = np.searchsorted(self._timestamps, start_ns, side="left")
+        hi = np.searchsorted(self._timestamps, end_ns, side="right")
+        prices = self._closes[lo:hi]
+        actions = actions[lo:hi]
+        weights = apply_stop_loss(weights[lo:hi], prices, params["stop_loss"])
+
+        # Decisions act at the close, so bar t's return accrues to the weight set at t - 1
+        returns = np.zeros(len(prices))
+        returns[1:] = prices[1:] / prices[:-1] - 1
+        held = np.concatenate([[0.0], weights[:-1]])
+        portfolio_value = self.initial_capital * np.cumprod(1 + held * returns)
+        stock = weights * portfolio_value / prices
+        cash = portfolio_value - stock * prices
 
-        # Calculate Sharpe Ratio (assuming 252 trading days in a year)
-        returns_mean = performance_df["Daily Return"].mean()
-        returns_std = performance_df["Daily Return"].std()
-        sharpe_ratio = returns_mean / returns_std if returns_std != 0 else 0
-        self.logger.info(f"Sharpe Ratio: {sharpe_ratio:.2f}")
+        dates = pd.DatetimeIndex(self._timestamps[lo:hi], tz="UTC").tz_convert(None).normalize()
+        results = pd.DataFrame({
+            "Action": actions,
+            "Target Weight": weights,
+            "Cash": cash,
+            "Stock": stock,
+            "Portfolio Value": portfolio_value,
+        }, index=pd.Index(dates, name="Date"))
 
-        # Calculate Maximum Drawdown
-        rolling_max = performance_df["Portfolio Value"].cummax()
-        drawdown = performance_df["Portfolio Value"] / rolling_max - 1
-        max_drawdown = drawdown.min()
-        self.logger.info(f"Maximum Drawdown: {max_drawdown * 100:.2f}%")
+        traded = np.abs(np.diff(stock, prepend=0.0)) * prices
+        self.metrics.update_batch(portfolio_value, stock * prices, traded)
+        if self.record_history:
+            self.portfolio_values = [
+                {"Date": date, "Portfolio Value": value}
+                for date, value in zip(dates, portfolio_value)
+            ]
+        if len(results):
+            self.portfolio = {
+                "cash": cash[-1],
+                "stock": stock[-1],
+                "portfolio_value": portfolio_value[-1],
+            }
+        return results
+
+    def analyze_performance(self, plot_path=None):
+        """
+        Log the run's performance metrics.
+
+        Args:
+            plot_path (str, optional): Write a portfolio value chart to this file.
+                Requires record_history.
+
+        Returns:
+            pd.DataFrame: Daily portfolio values and returns, or None when the
+                history was not recorded
+        """
+        summary = self.metrics.summary()
+        self.logger.info(f"Total Return: {summary['total_return'] * 100:.2f}%")
+        self.logger.info(f"Sharpe Ratio (annualized): {summary['sharpe_ratio']:.2f}")
+        self.logger.info(f"Maximum Drawdown: {summary['max_drawdown'] * 100:.2f}%")
+        self.logger.info(f"Turnover: {summary['turnover']:.2f}x, Average Exposure: {summary['average_exposure'] * 100:.2f}%")
+
+        if not self.record_history:
+            return None
+
+        performance_df = pd.DataFrame(self.portfolio_values).set_index("Date")
+        performance_df["Daily Return"] = performance_df["Portfolio Value"].pct_change()
+
+        if plot_path:
+            save_performance_plot(performance_df, plot_path)
+            self.logger.info(f"Saved portfolio value plot to {plot_path}")
 
         return performance_df
 
@@ -137,18 +384,35 @@ if __name__ == "__main__":
     parser.add_argument('--end_date', type=str, default=datetime.now().strftime('%Y-%m-%d'), help='End date in YYYY-MM-DD format')
     parser.add_argument('--start_date', type=str, default=(datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d'), help='Start date in YYYY-MM-DD format')
     parser.add_argument('--initial_capital', type=float, default=100000, help='Initial capital amount (default: 100000)')
+    parser.add_argument('--preload', action='store_true', help='Load all prices once instead of fetching them every simulated day')
+    parser.add_argument('--vectorized', action='store_true', help='Evaluate the rule-based agent stack over the whole history with NumPy')
+    parser.add_argument('--plot', type=str, help='Save the portfolio value chart to this image file')
 
     args = parser.parse_args()
 
+    # The vectorized backtest applies the agent rules itself; only the day-by-day
+    # loop calls the hedge fund entry point, so import it only for that mode
+    agent = None
+    if not args.vectorized:
+        try:
+            from src.agents import run_hedge_fund
+        except ImportError:
+            parser.error("The day-by-day backtest needs src.agents.run_hedge_fund; use --vectorized")
+        agent = run_hedge_fund
+
     # Create an instance of Backtester
     backtester = Backtester(
-        agent=run_hedge_fund,
+        agent=agent,
         ticker=args.ticker,
         start_date=args.start_date,
         end_date=args.end_date,
         initial_capital=args.initial_capital,
+        preload=args.preload,
     )
 
     # Run the backtesting process
-    backtester.run_backtest()
-    performance_df = backtester.analyze_performance()
+    if args.vectorized:
+        backtester.run_vectorized_backtest()
+    else:
+        backtester.run_backtest()
+    performance_df = backtester.analyze_performance(plot_path=args.plot)
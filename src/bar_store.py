@@ -0,0 +1,242 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'bars')
+
+def _to_ns(value):
+    """Convert a datetime/date string to UTC epoch nanoseconds (naive values are UTC)."""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize('UTC')
+    return int(ts.tz_convert('UTC').value)
+
+def _from_ns(value):
+    return pd.Timestamp(value, tz='UTC').to_pydatetime()
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock on path/.lock, shared by every process using the store."""
+    os.makedirs(path, exist_ok=True)
+    with open(os.path.join(path, '.lock'), 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def _merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def _missing_intervals(start, end, covered):
+    """Return the sub-ranges of [start, end] not covered by the merged intervals."""
+    gaps = []
+    cursor = start
+    for cov_start, cov_end in covered:
+        if cov_end < cursor:
+            continue
+        if cov_start > end:
+            break
+        if cov_start > cursor:
+            gaps.append((cursor, cov_start))
+        cursor = max(cursor, cov_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+class BarStore:
+    """
+    Local columnar bar store with gap-aware range filling.
+
+    Bars are kept per symbol and timeframe as one memory-mapped ``.npy`` file
+    per column (timestamps as UTC epoch nanoseconds), next to a ``meta.json``
+    recording the column names and the time ranges already downloaded. A
+    request is served from disk for the covered part and only the missing
+    sub-ranges are fetched.
+
+    Requests for the same symbol and timeframe are serialized, across threads
+    by an in-process lock and across processes by a lock file, so readers
+    never see a half-written set of columns.
+
+    Args:
+        fetch (Callable, optional): fetch(symbol, start, end, timeframe) returning an
+            Alpaca-style bars DataFrame. Required unless running offline.
+        root (str, optional): Store directory. Defaults to BAR_STORE_DIR or data/bars.
+        offline (bool, optional): Never fetch; serve only what is on disk.
+            Defaults to the BAR_STORE_OFFLINE environment variable.
+    """
+
+    def __init__(self, fetch=None, root=None, offline=None):
+        self.fetch = fetch
+        self.root = root or os.getenv('BAR_STORE_DIR', DEFAULT_STORE_DIR)
+        if offline is None:
+            offline = os.getenv('BAR_STORE_OFFLINE', 'false').lower() in ('1', 'true', 'yes')
+        self.offline = offline
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def _locked(self, symbol, timeframe):
+        key = (symbol.upper(), str(timeframe))
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock, _file_lock(self._path(symbol, timeframe)):
+            yield
+
+    def _path(self, symbol, timeframe):
+        return os.path.join(self.root, str(timeframe), symbol.upper())
+
+    def _load_meta(self, path):
+        meta_file = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return {"columns": [], "coverage": []}
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _load_columns(self, path, meta):
+        """Memory-map the stored columns; returns (timestamps, {column: array})."""
+        if not meta["columns"]:
+            return np.empty(0, dtype=np.int64), {}
+        timestamps = np.load(os.path.join(path, 'timestamp.npy'), mmap_mode='r')
+        columns = {
+            name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            for name in meta["columns"]
+        }
+        return timestamps, columns
+
+    def _save(self, path, timestamps, columns, coverage):
+        os.makedirs(path, exist_ok=True)
+        # Temp names are unique per writer so concurrent writers never share a file
+        suffix = f'{os.getpid()}-{threading.get_ident()}.tmp'
+        arrays = {'timestamp': timestamps, **columns}
+        for name, values in arrays.items():
+            tmp_file = os.path.join(path, f'{name}.{suffix}.npy')
+            np.save(tmp_file, values)
+            os.replace(tmp_file, os.path.join(path, f'{name}.npy'))
+        # Metadata is written last so a partial write never advertises coverage
+        meta_tmp = os.path.join(path, f'meta.{suffix}.json')
+        with open(meta_tmp, 'w', encoding='utf-8') as f:
+            json.dump({"columns": list(columns), "coverage": coverage}, f)
+        os.replace(meta_tmp, os.path.join(path, 'meta.json'))
+
+    def _merge_fetched(self, path, meta, fetched, coverage):
+        """Merge newly fetched bars into the stored columns and persist them."""
+        timestamps, columns = self._load_columns(path, meta)
+        column_names = meta["columns"] or [
+            c for c in fetched[0].columns if np.issubdtype(fetched[0][c].dtype, np.number)
+        ]
+
+        parts_ts = [np.asarray(timestamps)]
+        parts = {name: [np.asarray(columns[name])] if name in columns else [] for name in column_names}
+        for frame in fetched:
+            index = frame.index.get_level_values(-1) if isinstance(frame.index, pd.MultiIndex) else frame.index
+            index = pd.DatetimeIndex(index)
+            if index.tz is None:
+                index = index.tz_localize('UTC')
+            parts_ts.append(index.tz_convert('UTC').asi8)
+            for name in column_names:
+                values = frame[name] if name in frame else pd.Series(np.nan, index=frame.index)
+                parts[name].append(values.to_numpy(dtype=float))
+
+        all_ts = np.concatenate(parts_ts)
+        # Later fetches win over stored values for the same timestamp
+        order = np.argsort(all_ts, kind='stable')
+        sorted_ts = all_ts[order]
+        keep = np.ones(len(sorted_ts), dtype=bool)
+        keep[:-1] = sorted_ts[1:] != sorted_ts[:-1]
+
+        merged_columns = {
+            name: np.concatenate(parts[name])[order][keep] if parts[name] else np.full(keep.sum(), np.nan)
+            for name in column_names
+        }
+        self._save(path, sorted_ts[keep], merged_columns, coverage)
+
+    def get_bars(self, symbol, start, end, timeframe="1Day"):
+        """
+        Return bars for symbol in [start, end], fetching only uncovered sub-ranges.
+
+        Args:
+            symbol (str): Ticker symbol
+            start (datetime | str): Range start (naive values are treated as UTC)
+            end (datetime | str): Range end, inclusive
+            timeframe: Bar timeframe; its string form names the store directory
+
+        Returns:
+            pd.DataFrame: Bars indexed by (symbol, timestamp), like Alpaca's bars.df
+        """
+        with self._locked(symbol, timeframe):
+            return self._get_bars(symbol, start, end, timeframe)
+
+    def _get_bars(self, symbol, start, end, timeframe):
+        path = self._path(symbol, timeframe)
+        meta = self._load_meta(path)
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+
+        gaps = _missing_intervals(start_ns, end_ns, meta["coverage"])
+        if gaps and not self.offline:
+            if self.fetch is None:
+                raise ValueError("BarStore has no fetch function configured")
+            # Ranges reaching into the current day may still change, so they
+            # are stored but not marked as covered
+            today_ns = _to_ns(datetime.now(timezone.utc).date())
+            fetched = []
+            coverage = [list(c) for c in meta["coverage"]]
+            for gap_start, gap_end in gaps:
+                logger.debug(f"Fetching {symbol} {timeframe} bars from {_from_ns(gap_start)} to {_from_ns(gap_end)}")
+                frame = self.fetch(symbol, _from_ns(gap_start), _from_ns(gap_end), timeframe)
+                if frame is not None and len(frame) > 0:
+                    fetched.append(frame)
+                if gap_start < today_ns:
+                    coverage.append([gap_start, min(gap_end, today_ns)])
+            coverage = _merge_intervals(coverage)
+            if fetched:
+                self._merge_fetched(path, meta, fetched, coverage)
+                meta = self._load_meta(path)
+            elif coverage != meta["coverage"]:
+                self._save(path, *self._load_columns(path, meta), coverage)
+                meta = self._load_meta(path)
+        elif gaps:
+            logger.warning(f"Offline bar store is missing {len(gaps)} range(s) for {symbol}")
+
+        timestamps, columns = self._load_columns(path, meta)
+        lo = np.searchsorted(timestamps, start_ns, side='left')
+        hi = np.searchsorted(timestamps, end_ns, side='right')
+        index = pd.MultiIndex.from_arrays(
+            [np.full(hi - lo, symbol), pd.DatetimeIndex(np.asarray(timestamps[lo:hi]), tz='UTC')],
+            names=['symbol', 'timestamp']
+        )
+        # Copy out of the memory maps so the frame outlives later rewrites
+        return pd.DataFrame(
+            {name: np.array(values[lo:hi]) for name, values in columns.items()},
+            index=index
+        )
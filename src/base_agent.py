@@ -12,7 +12,9 @@ from typing import Dict, Any
 from dotenv import load_dotenv
 from src.llm_config import llm_config
 from src.user_profile import UserProfileManager
-import time
+from src.clock import system_clock
+from src.scheduler import TimerScheduler
+from src import offload
 
 # Load environment variables
 load_dotenv()
@@ -22,13 +24,22 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 class BaseAgent(ABC):
-    def __init__(self, name=None, user_name=None):
+    # Message types delivered to this agent; None subscribes to every type
+    subscribed_message_types = None
+    # Message types that wake the agent to run process()
+    wake_message_types = ()
+    # Seconds between timer wakeups; None runs process() only on messages
+    process_interval = None
+
+    def __init__(self, name=None, user_name=None, clock=None, scheduler=None):
         """
         Initialize the base agent with optional name and user name
         
         Args:
             name (str, optional): Name of the agent
             user_name (str, optional): Name of the user interacting with the system
+            clock (Clock, optional): Time source; a VirtualClock enables accelerated replay
+            scheduler (TimerScheduler, optional): Shared timers for periodic wakeups
         """
         self.name = name or self.__class__.__name__
         # Prioritize passed user_name, then check profile, default to 'Trader'
@@ -41,6 +52,20 @@ class BaseAgent(ABC):
         # Initialization flag
         self._initialized = False
         
+        # Time source and inputs received from other agents
+        self.clock = clock or system_clock
+        self.scheduler = scheduler or TimerScheduler(self.clock)
+        self.state = {}
+
+        # process() runs when woken by a message or timer instead of polling
+        self._wakeup = asyncio.Event()
+        self._processing = False
+        self._timer = None
+
+        # Input fingerprints of the last result per key, to skip redundant recomputation
+        self._fingerprints = {}
+        self.reused_results = 0
+        
         # LLM Configuration
         self.llm = llm_config.get_chat_model()
 
@@ -82,10 +107,17 @@ class BaseAgent(ABC):
             await self.initialize()
         
         # Subscribe to messages
-        await message_bus.subscribe(self.agent_type, self._handle_message)
+        await message_bus.subscribe(
+            self._handle_message,
+            self.agent_type,
+            message_types=self.subscribed_message_types
+        )
         
-        # Start agent's main loop
+        # Start agent's main loop, processing once right away
+        self.wake()
         asyncio.create_task(self._run())
+        if self.process_interval:
+            self._timer = self.scheduler.call_every(self.process_interval, self.wake)
         
         await self.broadcast_message(
             f"{self.name} is running.",
@@ -102,16 +134,64 @@ class BaseAgent(ABC):
         )
         
         self._initialized = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Let the main loop observe the stop and exit
+        self.wake()
         self.logger.info(f"{self.name} stopped")
 
+    async def run_blocking(self, func, *args, **kwargs):
+        """Run blocking I/O (e.g. get_prices) in the shared thread pool and await the result"""
+        return await offload.run_io(func, *args, **kwargs)
+
+    async def run_compute(self, func, *args, **kwargs):
+        """Run CPU-bound work (e.g. pandas analysis) in the compute pool and await the result"""
+        return await offload.run_compute(func, *args, **kwargs)
+
+    def inputs_unchanged(self, key, fingerprint) -> bool:
+        """
+        Check whether key's inputs match those of its last recorded result.
+
+        Args:
+            key: What the result is for, e.g. a ticker
+            fingerprint: Comparable summary of every input the result depends on
+
+        Returns:
+            bool: True if the previous result can be reused
+        """
+        if key in self._fingerprints and self._fingerprints[key] == fingerprint:
+            self.reused_results += 1
+            return True
+        return False
+
+    def record_inputs(self, key, fingerprint):
+        """Remember the inputs key's result was just produced from"""
+        self._fingerprints[key] = fingerprint
+
+    def wake(self):
+        """Schedule a process() run"""
+        self._wakeup.set()
+
+    @property
+    def busy(self) -> bool:
+        """True while process() is running or a wakeup is pending"""
+        return self._processing or self._wakeup.is_set()
+
     async def _run(self):
-        """Enhanced main agent loop with more robust error handling"""
+        """Main agent loop: sleep until woken by a relevant message or timer, then process"""
         try:
             # Use _initialized instead of _running
             while self._initialized:
-                await self.process()
-                # Add a small delay to prevent tight looping
-                await asyncio.sleep(1)
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                if not self._initialized:
+                    break
+                self._processing = True
+                try:
+                    await self.process()
+                finally:
+                    self._processing = False
         except Exception as e:
             self.logger.error(f"Error in agent main loop: {e}")
             # Optionally re-raise or handle specific exceptions
@@ -125,7 +205,7 @@ class BaseAgent(ABC):
     async def _handle_message(self, message: dict):
         """Handle incoming messages"""
         try:
-            logger.debug(f"Agent {self.name} received message: {message}")
+            logger.debug("Agent %s received message: %s", self.name, message)
             
             # Log detailed message information
             logger.info(f"Processing message for {self.name}: type={message.get('type')}, sender={message.get('sender')}, private={message.get('private')}")
@@ -138,6 +218,8 @@ class BaseAgent(ABC):
             # Handle all messages, including private ones
             # Remove the restrictive sender check
             await self.handle_message(message)
+            if message.get("type") in self.wake_message_types:
+                self.wake()
         except Exception as e:
             logger.error(f"Error handling message in {self.name}: {e}", exc_info=True)
 
@@ -224,7 +306,7 @@ class BaseAgent(ABC):
         """Generate a thought with rate limiting and error handling."""
         try:
             # Add cooldown between thoughts
-            current_time = time.time()
+            current_time = self.clock.time()
             if hasattr(self, '_last_thought_time'):
                 time_since_last = current_time - self._last_thought_time
                 if time_since_last < 10:  # Minimum 10 seconds between thoughts
@@ -303,7 +385,8 @@ class BaseAgent(ABC):
             logger.error(f"Error in contextual thought generation for {self.name}: {e}")
             return f"Collaborative insights for {self.name} are being processed."
 
-    async def broadcast_message(self, content: Any, message_type: str = "agent_message", private: bool = False):
+    async def broadcast_message(self, content: Any, message_type: str = "agent_message", private: bool = False,
+                                priority: Optional[int] = None):
         """
         Broadcast a message through the message bus
         
@@ -311,6 +394,7 @@ class BaseAgent(ABC):
             content: Message content
             message_type: Type of message (default: agent_message)
             private: Whether the message is private (default: False)
+            priority: Message bus priority class (default: by message type)
         """
         try:
             logger.debug(f"{self.__class__.__name__} broadcasting message: {content}")
@@ -318,7 +402,8 @@ class BaseAgent(ABC):
                 sender=self.__class__.__name__.lower().replace("agent", ""),
                 message_type=message_type,
                 content=content,
-                private=private
+                private=private,
+                priority=priority
             )
         except Exception as e:
             logger.error(f"Error broadcasting message in {self.__class__.__name__}: {e}", exc_info=True)
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import tempfile
+from typing import Dict, Iterable, Optional
+
+from src.envelope import Envelope, encode_json
+
+logger = logging.getLogger(__name__)
+
+# Frames are a 4-byte big-endian length followed by a JSON object
+_HEADER = struct.Struct(">I")
+
+def default_bus_address() -> str:
+    """A per-process Unix socket path, or a loopback TCP address where Unix sockets are unavailable."""
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(tempfile.gettempdir(), f"ai-hedge-fund-bus-{os.getpid()}.sock")
+    return "127.0.0.1:0"
+
+def _split_tcp_address(address: str):
+    """Return (host, port) for a "host:port" address, or None for a socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and os.sep not in address:
+        return host or "127.0.0.1", int(port)
+    return None
+
+def encode_frame(frame: dict) -> bytes:
+    payload = encode_json(frame).encode("utf-8")
+    return _HEADER.pack(len(payload)) + payload
+
+# Publish frames embed the envelope's cached encoding between this prefix and "}"
+_PUBLISH_PREFIX = b'{"op": "publish", "message": '
+
+def encode_publish_frame(envelope: Envelope) -> bytes:
+    payload = _PUBLISH_PREFIX + envelope.encoded + b"}"
+    return _HEADER.pack(len(payload)) + payload
+
+async def read_payload(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    return await reader.readexactly(length)
+
+def decode_envelope(payload: bytes) -> Envelope:
+    """Envelope from a publish frame payload, reusing the embedded encoding"""
+    if payload.startswith(_PUBLISH_PREFIX) and payload.endswith(b"}"):
+        return Envelope.decode(payload[len(_PUBLISH_PREFIX):-1])
+    return Envelope.from_dict(json.loads(payload)["message"])
+
+class LocalTransport:
+    """Default transport: published messages go straight into the bus's own queue."""
+
+    def __init__(self):
+        self.bus = None
+
+    async def connect(self, bus):
+        self.bus = bus
+
+    async def send(self, message: Envelope):
+        await self.bus.message_queue.put(message)
+
+    async def update_subscriptions(self, message_types: Optional[Iterable[str]]):
+        pass
+
+    async def close(self):
+        pass
+
+class SocketTransport:
+    """
+    Carries MessageBus traffic through a BusHub so buses in different
+    processes share one message stream.
+
+    Published messages are sent to the hub, which relays them to every
+    connected bus (including the sender's) that subscribes to the message
+    type. Received messages enter the local bus queue and are routed to
+    local subscribers as usual.
+
+    Args:
+        address (str): Unix socket path or "host:port" of the hub
+    """
+
+    def __init__(self, address: str):
+        self.address = address
+        self.bus = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._receiver: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self, bus):
+        self.bus = bus
+        async with self._lock:
+            if self._writer is not None:
+                return
+            tcp = _split_tcp_address(self.address)
+            if tcp:
+                self._reader, self._writer = await asyncio.open_connection(*tcp)
+            else:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.address)
+            self._receiver = asyncio.create_task(self._receive())
+            logger.info(f"Connected to message bus hub at {self.address}")
+        await self.update_subscriptions(bus.subscribed_message_types())
+
+    async def _receive(self):
+        try:
+            while True:
+                payload = await read_payload(self._reader)
+                await self.bus.message_queue.put(decode_envelope(payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.info(f"Message bus hub at {self.address} closed the connection")
+        except Exception as e:
+            logger.error(f"Error receiving from message bus hub: {e}", exc_info=True)
+
+    async def _write(self, data: bytes):
+        if self._writer is None:
+            await self.connect(self.bus)
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def send(self, message: Envelope):
+        await self._write(encode_publish_frame(message))
+
+    async def update_subscriptions(self, message_types: Optional[Iterable[str]]):
+        if self._writer is None:
+            return
+        await self._write(encode_frame({"op": "subscribe", "types": None if message_types is None else sorted(message_types)}))
+
+    async def close(self):
+        if self._receiver:
+            self._receiver.cancel()
+            self._receiver = None
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._writer = None
+
+class _HubPeer:
+    __slots__ = ("writer", "message_types", "outbox", "sender")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.message_types = None
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.sender: Optional[asyncio.Task] = None
+
+class BusHub:
+    """
+    Relay between SocketTransport peers (one per process).
+
+    Each peer declares the message types its bus subscribes to, and every
+    published frame is forwarded as received to the interested peers. Peers are written
+    by their own sender task, so a slow process does not delay the others.
+
+    Args:
+        address (str, optional): Unix socket path or "host:port" to listen on.
+            Defaults to default_bus_address().
+    """
+
+    def __init__(self, address: Optional[str] = None):
+        self.address = address or default_bus_address()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Dict[asyncio.StreamWriter, _HubPeer] = {}
+
+    async def start(self) -> str:
+        """
+        Start listening.
+
+        Returns:
+            str: The bound address for peers to connect to (resolves TCP port 0)
+        """
+        tcp = _split_tcp_address(self.address)
+        if tcp:
+            self._server = await asyncio.start_server(self._handle_peer, *tcp)
+            host, port = self._server.sockets[0].getsockname()[:2]
+            self.address = f"{host}:{port}"
+        else:
+            if os.path.exists(self.address):
+                os.remove(self.address)
+            self._server = await asyncio.start_unix_server(self._handle_peer, self.address)
+        logger.info(f"Message bus hub listening on {self.address}")
+        return self.address
+
+    async def _handle_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = _HubPeer(writer)
+        peer.sender = asyncio.create_task(self._send_loop(peer))
+        self._peers[writer] = peer
+        try:
+            while True:
+                payload = await read_payload(reader)
+                frame = json.loads(payload)
+                op = frame.get("op")
+                if op == "subscribe":
+                    types = frame.get("types")
+                    peer.message_types = None if types is None else frozenset(types)
+                elif op == "publish":
+                    data = _HEADER.pack(len(payload)) + payload
+                    message_type = frame["message"]["type"]
+                    for other in list(self._peers.values()):
+                        if other.message_types is None or message_type in other.message_types:
+                            other.outbox.put_nowait(data)
+                else:
+                    logger.warning(f"Unknown message bus hub frame: {op}")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Error in message bus hub peer: {e}", exc_info=True)
+        finally:
+            self._peers.pop(writer, None)
+            peer.sender.cancel()
+            writer.close()
+
+    async def _send_loop(self, peer: _HubPeer):
+        try:
+            while True:
+                data = await peer.outbox.get()
+                peer.writer.write(data)
+                await peer.writer.drain()
+        except ConnectionError:
+            pass
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for peer in list(self._peers.values()):
+            peer.sender.cancel()
+            peer.writer.close()
+        self._peers.clear()
+        if not _split_tcp_address(self.address) and os.path.exists(self.address):
+            os.remove(self.address)
+        logger.info("Message bus hub stopped")
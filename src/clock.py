@@ -0,0 +1,72 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+
+class Clock:
+    """Wall-clock time source. Agents and the message bus read time through a Clock so it can be replaced."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+class VirtualClock(Clock):
+    """
+    Manually advanced clock for replaying history faster than real time.
+
+    ``sleep`` parks the caller until ``advance``/``advance_to`` moves virtual
+    time past its wake-up point, so code written against the Clock interface
+    runs as fast as it can process instead of waiting for wall-clock time.
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = float(start)
+        self._sleepers = []
+        self._counter = itertools.count()
+
+    def time(self) -> float:
+        return self._now
+
+    async def sleep(self, seconds: float):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._sleepers, (self._now + max(seconds, 0.0), next(self._counter), future))
+        await future
+
+    async def advance_to(self, timestamp: float):
+        """Move virtual time forward, waking sleepers in wake-up order."""
+        while self._sleepers and self._sleepers[0][0] <= timestamp:
+            wake_time, _, future = heapq.heappop(self._sleepers)
+            self._now = max(self._now, wake_time)
+            if not future.done():
+                future.set_result(None)
+                # Let the woken coroutine run up to its next await
+                await asyncio.sleep(0)
+        self._now = max(self._now, float(timestamp))
+
+    async def advance(self, seconds: float):
+        await self.advance_to(self._now + seconds)
+
+    async def jump_to(self, timestamp: float):
+        """
+        Move virtual time straight to timestamp, waking each due sleeper once.
+
+        Unlike advance_to, a loop that sleeps again is not woken repeatedly
+        for the skipped interval, so idle polling costs nothing.
+        """
+        self._now = max(self._now, float(timestamp))
+        due = []
+        while self._sleepers and self._sleepers[0][0] <= self._now:
+            due.append(heapq.heappop(self._sleepers)[2])
+        for future in due:
+            if not future.done():
+                future.set_result(None)
+        await asyncio.sleep(0)
+
+# Default clock shared by agents and the message bus
+system_clock = Clock()
@@ -0,0 +1,58 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Payload layout tag, so consumers can tell columnar payloads from other content
+COLUMNAR_FORMAT = "columnar"
+
+def _epoch_seconds(index) -> np.ndarray:
+    index = pd.DatetimeIndex(index)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return index.asi8 // 1_000_000_000
+
+def frame_to_columns(df: pd.DataFrame, columns=None) -> dict:
+    """
+    Encode a time-indexed DataFrame as a columnar payload.
+
+    Times become one int64 array of epoch seconds and each numeric column a
+    float64 array. In-process subscribers get the NumPy arrays as they are;
+    they are written out as JSON lists only when the message is serialized
+    (socket transport, journal, WebSocket clients).
+
+    Args:
+        df (pd.DataFrame): Frame indexed by timestamp (naive timestamps are taken as UTC)
+        columns (list, optional): Columns to include. Defaults to every numeric column.
+
+    Returns:
+        dict: {"format": "columnar", "time": int64 array, "columns": {name: float64 array}}
+    """
+    if columns is None:
+        columns = df.select_dtypes("number").columns
+    return {
+        "format": COLUMNAR_FORMAT,
+        "time": _epoch_seconds(df.index),
+        "columns": {str(name): df[name].to_numpy(dtype=np.float64) for name in columns},
+    }
+
+def columns_to_frame(payload: dict, index_name: Optional[str] = "timestamp") -> pd.DataFrame:
+    """
+    Decode a columnar payload into a DataFrame indexed by UTC timestamps.
+
+    Works on the in-process arrays and on JSON-decoded lists alike; arrays
+    are used without copying.
+
+    Args:
+        payload (dict): Payload from frame_to_columns
+        index_name (str, optional): Name for the DatetimeIndex
+
+    Returns:
+        pd.DataFrame: One float64 column per payload column
+    """
+    times = np.asarray(payload["time"], dtype=np.int64)
+    index = pd.DatetimeIndex(times * 1_000_000_000, tz="UTC", name=index_name)
+    return pd.DataFrame(
+        {name: np.asarray(values, dtype=np.float64) for name, values in payload["columns"].items()},
+        index=index,
+    )
@@ -0,0 +1,114 @@
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+def _json_default(value):
+    # NumPy arrays (columnar payloads) and scalars expose .tolist(); anything else is sent as text
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+def _jsonable(value):
+    """Copy of value with dict keys JSON cannot encode (e.g. Timestamps from Series.to_dict) as text"""
+    if isinstance(value, dict):
+        return {
+            key if isinstance(key, (str, int, float, bool)) or key is None else str(key): _jsonable(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    return value
+
+def encode_json(value) -> str:
+    """Encode a message (or frame) as JSON text"""
+    try:
+        return json.dumps(value, default=_json_default)
+    except TypeError:
+        return json.dumps(_jsonable(value), default=_json_default)
+
+class Envelope:
+    """
+    A message on the bus.
+
+    Envelopes carry a sequence number (monotonic per publishing bus) and an
+    epoch timestamp, and are not modified after publishing. The JSON
+    encoding is computed on first use and cached, so WebSocket fan-out, the
+    journal, the socket transport and logging all share one serialization.
+
+    Existing subscribers can keep reading fields by key (message["type"],
+    message.get("content")).
+    """
+    __slots__ = ("seq", "sender", "type", "content", "timestamp", "private", "priority", "_text", "_bytes")
+
+    FIELDS = ("seq", "sender", "type", "content", "timestamp", "private", "priority")
+
+    def __init__(self, sender: str, type: str, content: Any, timestamp: float, private: bool = False,
+                 priority: int = 1, seq: int = 0, text: Optional[str] = None):
+        self.seq = seq
+        self.sender = sender
+        self.type = type
+        self.content = content
+        self.timestamp = timestamp
+        self.private = private
+        self.priority = priority
+        self._text = text
+        self._bytes = None
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.FIELDS
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @property
+    def datetime(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp)
+
+    @property
+    def text(self) -> str:
+        """JSON encoding, computed once"""
+        if self._text is None:
+            self._text = encode_json(self.to_dict())
+        return self._text
+
+    @property
+    def encoded(self) -> bytes:
+        """UTF-8 JSON encoding, computed once"""
+        if self._bytes is None:
+            self._bytes = self.text.encode("utf-8")
+        return self._bytes
+
+    @classmethod
+    def from_dict(cls, data: dict, text: Optional[str] = None) -> "Envelope":
+        return cls(
+            sender=data["sender"],
+            type=data["type"],
+            content=data.get("content"),
+            timestamp=data.get("timestamp", 0.0),
+            private=data.get("private", False),
+            priority=data.get("priority", 1),
+            seq=data.get("seq", 0),
+            text=text
+        )
+
+    @classmethod
+    def decode(cls, encoded) -> "Envelope":
+        """Rebuild an envelope from its JSON encoding, keeping the encoding cached"""
+        text = encoded if isinstance(encoded, str) else bytes(encoded).decode("utf-8")
+        return cls.from_dict(json.loads(text), text=text)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        return f"Envelope(seq={self.seq}, sender={self.sender!r}, type={self.type!r})"
@@ -0,0 +1,263 @@
+import logging
+import mmap
+import os
+import struct
+import threading
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+from src.envelope import Envelope
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'journal')
+
+# Record header: payload length, sequence number, epoch timestamp. The length is
+# written last, so a zero length marks the end of the log and a record torn by
+# a crash is never read back.
+_RECORD = struct.Struct("<IQd")
+_SEGMENT_SUFFIX = ".log"
+
+def compaction_key(message: Envelope) -> Optional[tuple]:
+    """
+    Default compaction key: the conflation key of message types the bus
+    conflates (newest market data per ticker, newest status per agent).
+    Other messages, and those the policy never conflates, have no key and are kept.
+    """
+    from src.message_bus import DEFAULT_QUEUE_POLICIES, QueuePolicy
+
+    policy = DEFAULT_QUEUE_POLICIES.get(message.type)
+    if policy is None or policy.policy != QueuePolicy.CONFLATE:
+        return None
+    key = policy.key(message)
+    return None if key is None else (message.type, key)
+
+def _segment_name(first_seq: int) -> str:
+    return f"{first_seq:020d}{_SEGMENT_SUFFIX}"
+
+def _scan(buffer, limit: int) -> Iterator[Tuple[int, int, float, int]]:
+    """Yield (offset, seq, timestamp, payload length) for each complete record in buffer[:limit]."""
+    pos = 0
+    while pos + _RECORD.size <= limit:
+        length, seq, timestamp = _RECORD.unpack_from(buffer, pos)
+        if length == 0 or pos + _RECORD.size + length > limit:
+            return
+        yield pos, seq, timestamp, length
+        pos += _RECORD.size + length
+
+class MessageJournal:
+    """
+    Append-only, segmented message log backed by memory-mapped files.
+
+    Every envelope gets a journal sequence number and its cached encoding is
+    appended to the active segment, a file preallocated to ``segment_size``
+    and mapped into memory. When a record does not fit, the segment is trimmed to its used length and
+    a new one is started, named after its first sequence number. Messages can
+    be read back from any sequence number with ``replay``. ``compact`` rewrites
+    the closed segments keeping only the newest message per compaction key.
+    Appending never compacts: once ``compact_after`` closed segments accumulate
+    ``compaction_due`` is set, and the owner runs ``compact`` where it does not
+    block (MessageBus uses the I/O thread pool). Compaction only touches closed
+    segments, so it can run while messages are being appended.
+
+    Args:
+        directory (str, optional): Where segments are stored. Defaults to the
+            BUS_JOURNAL_DIR environment variable or data/journal.
+        segment_size (int, optional): Bytes preallocated per segment
+        compact_after (int, optional): Closed segments that trigger compaction; 0 disables it
+        key (Callable, optional): Compaction key of an envelope, None to always keep it
+    """
+
+    def __init__(self, directory: Optional[str] = None, segment_size: int = 64 * 1024 * 1024,
+                 compact_after: int = 8, key: Callable[[Envelope], Any] = compaction_key):
+        self.directory = directory or os.getenv('BUS_JOURNAL_DIR') or DEFAULT_JOURNAL_DIR
+        self.segment_size = segment_size
+        self.compact_after = compact_after
+        self.key = key
+        self.compaction_due = False
+        self._compaction_lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._first_seq = 0
+        self._pos = 0
+        self.next_seq = 0
+        self._open_last_segment()
+
+    def _segments(self) -> List[Tuple[int, str]]:
+        """(first sequence number, path) of every segment, oldest first"""
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.endswith(_SEGMENT_SUFFIX) and name[:-len(_SEGMENT_SUFFIX)].isdigit():
+                segments.append((int(name[:-len(_SEGMENT_SUFFIX)]), os.path.join(self.directory, name)))
+        return sorted(segments)
+
+    def _open_last_segment(self):
+        segments = self._segments()
+        if not segments:
+            self._open_segment(0)
+            return
+        first_seq, path = segments[-1]
+        self._open_segment(first_seq, path)
+        self.next_seq = first_seq
+        for pos, seq, _, length in _scan(self._map, len(self._map)):
+            self._pos = pos + _RECORD.size + length
+            self.next_seq = seq + 1
+        logger.info(f"Opened message journal at {self.directory}, next sequence {self.next_seq}")
+
+    def _open_segment(self, first_seq: int, path: Optional[str] = None, size: Optional[int] = None):
+        path = path or os.path.join(self.directory, _segment_name(first_seq))
+        size = max(size or 0, self.segment_size)
+        self._file = open(path, 'a+b')
+        if os.path.getsize(path) < size:
+            self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), os.path.getsize(path))
+        self._first_seq = first_seq
+        self._pos = 0
+
+    def _close_segment(self):
+        """Flush the active segment and trim it to the bytes in use."""
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(self._pos)
+        self._file.close()
+        self._map = None
+        self._file = None
+
+    def append(self, message: Envelope) -> int:
+        """
+        Append a message.
+
+        Args:
+            message (Envelope): Bus message
+
+        Returns:
+            int: The message's journal sequence number
+        """
+        seq = self.next_seq
+        payload = message.encoded
+        needed = _RECORD.size + len(payload)
+        # Leave room for the zero length that terminates the segment
+        if self._pos + needed + 4 > len(self._map):
+            self._close_segment()
+            self._open_segment(seq, size=needed + 4)
+            if self.compact_after and len(self._segments()) - 1 >= self.compact_after:
+                self.compaction_due = True
+
+        start = self._pos + _RECORD.size
+        self._map[start:start + len(payload)] = payload
+        struct.pack_into("<Qd", self._map, self._pos + 4, seq, message.timestamp)
+        struct.pack_into("<I", self._map, self._pos, len(payload))
+        self._pos += needed
+        self.next_seq = seq + 1
+        return seq
+
+    def replay(self, from_seq: int = 0) -> Iterator[Tuple[int, float, Envelope]]:
+        """
+        Read messages back in order.
+
+        Args:
+            from_seq (int, optional): First sequence number to return
+
+        Yields:
+            tuple: (sequence number, timestamp, message)
+        """
+        segments = self._segments()
+        # Skip segments that end before from_seq
+        start = 0
+        for index, (first_seq, _) in enumerate(segments):
+            if first_seq <= from_seq:
+                start = index
+        for first_seq, path in segments[start:]:
+            for seq, timestamp, message in self._read_segment(first_seq, path):
+                if seq >= from_seq:
+                    yield seq, timestamp, message
+
+    def _read_segment(self, first_seq: int, path: str) -> Iterator[Tuple[int, float, Envelope]]:
+        if first_seq == self._first_seq and self._map is not None:
+            buffer, limit, handle = self._map, self._pos, None
+        else:
+            size = os.path.getsize(path)
+            if size == 0:
+                return
+            handle = open(path, 'rb')
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            limit = size
+        try:
+            for pos, seq, timestamp, length in _scan(buffer, limit):
+                start_byte = pos + _RECORD.size
+                yield seq, timestamp, Envelope.decode(buffer[start_byte:start_byte + length])
+        finally:
+            if handle is not None:
+                buffer.close()
+                handle.close()
+
+    def compact(self):
+        """
+        Rewrite the closed segments into one, keeping only the newest message
+        per compaction key. Sequence numbers are preserved. Safe to call from
+        another thread while messages are appended.
+        """
+        with self._compaction_lock:
+            self.compaction_due = False
+            active_seq = self._first_seq
+            closed = [(first_seq, path) for first_seq, path in self._segments() if first_seq < active_seq]
+            if not closed:
+                return
+
+            def records():
+                for first_seq, path in closed:
+                    yield from self._read_segment(first_seq, path)
+
+            latest = {}
+            for seq, _, message in records():
+                key = self.key(message)
+                if key is not None:
+                    latest[key] = seq
+
+            kept = removed = 0
+            compacted_path = os.path.join(self.directory, _segment_name(closed[0][0]) + ".tmp")
+            with open(compacted_path, 'wb') as out:
+                for seq, timestamp, message in records():
+                    key = self.key(message)
+                    if key is not None and latest.get(key) != seq:
+                        removed += 1
+                        continue
+                    payload = message.encoded
+                    out.write(_RECORD.pack(len(payload), seq, timestamp))
+                    out.write(payload)
+                    kept += 1
+            for _, path in closed:
+                os.remove(path)
+            os.replace(compacted_path, os.path.join(self.directory, _segment_name(closed[0][0])))
+            logger.info(f"Compacted {len(closed)} journal segments: kept {kept} messages, removed {removed}")
+
+    def flush(self):
+        """Write the active segment's pages to disk."""
+        if self._map is not None:
+            self._map.flush()
+
+    def close(self):
+        if self._map is not None:
+            self._close_segment()
+
+### Inspect a Journal #####
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Print or compact a message bus journal')
+    parser.add_argument('--dir', type=str, default=None, help='Journal directory (default: BUS_JOURNAL_DIR or data/journal)')
+    parser.add_argument('--from_seq', type=int, default=0, help='First sequence number to print')
+    parser.add_argument('--compact', action='store_true', help='Compact closed segments instead of printing')
+
+    args = parser.parse_args()
+
+    journal = MessageJournal(args.dir)
+    try:
+        if args.compact:
+            journal.compact()
+        else:
+            for seq, timestamp, message in journal.replay(args.from_seq):
+                print(seq, timestamp, message.sender, message.type, message.text[:120])
+    finally:
+        journal.close()
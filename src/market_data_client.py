@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from src import offload
+from src.tools import get_prices, get_prices_panel
+
+logger = logging.getLogger(__name__)
+
+# Alpaca's free data plan allows 200 requests per minute
+DEFAULT_MAX_CONCURRENCY = int(os.getenv('MARKET_DATA_MAX_CONCURRENCY', '4'))
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv('MARKET_DATA_REQUESTS_PER_MINUTE', '200'))
+
+class AsyncMarketDataClient:
+    """
+    Async front end for the synchronous price functions in src.tools.
+
+    Requests run on the shared I/O thread pool, at most ``max_concurrency``
+    at a time and no faster than ``requests_per_minute``. Concurrent
+    identical requests are coalesced (single-flight): the first caller
+    starts the fetch and every caller awaits the same result. Cancelling one
+    caller leaves the fetch running for the others.
+
+    Args:
+        fetch_prices (Callable, optional): get_prices-style function (ticker, start_date, end_date)
+        fetch_panel (Callable, optional): get_prices_panel-style function (tickers, start_date, end_date)
+        max_concurrency (int, optional): Requests allowed in flight at once
+        requests_per_minute (int, optional): Request start rate limit; 0 disables it
+    """
+
+    def __init__(self, fetch_prices: Callable = get_prices, fetch_panel: Callable = get_prices_panel,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE):
+        self.fetch_prices = fetch_prices
+        self.fetch_panel = fetch_panel
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._next_start = 0.0
+        self.stats = {"requests": 0, "fetches": 0, "coalesced": 0, "errors": 0}
+
+    async def get_prices(self, ticker: str, start_date: str, end_date: str):
+        """Async get_prices: bars for one ticker and date range."""
+        return await self._single_flight(("prices", ticker, start_date, end_date),
+                                         self.fetch_prices, ticker, start_date, end_date)
+
+    async def get_prices_panel(self, tickers, start_date: str, end_date: str):
+        """Async get_prices_panel: bars for several tickers in one request."""
+        tickers = sorted(set(tickers))
+        return await self._single_flight(("panel", tuple(tickers), start_date, end_date),
+                                         self.fetch_panel, tickers, start_date, end_date)
+
+    async def _single_flight(self, key: Hashable, func: Callable, *args) -> Any:
+        self.stats["requests"] += 1
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            # The fetch runs as its own task so no single caller owns it
+            task = asyncio.ensure_future(self._fetch(func, *args))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._fetch_done(key, done))
+        # Shield so a cancelled caller does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def _fetch_done(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieving the exception also keeps asyncio from logging it when
+        # every caller was cancelled before the fetch failed
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    async def _fetch(self, func: Callable, *args) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            await self._wait_for_rate_limit()
+            self.stats["fetches"] += 1
+            return await offload.run_io(func, *args)
+
+    async def _wait_for_rate_limit(self):
+        if not self.requests_per_minute:
+            return
+        now = time.monotonic()
+        start = max(now, self._next_start)
+        self._next_start = start + 60.0 / self.requests_per_minute
+        if start > now:
+            await asyncio.sleep(start - now)
+
+# Shared client so agents and UI requests coalesce with each other
+market_data_client = AsyncMarketDataClient()
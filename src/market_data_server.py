@@ -0,0 +1,155 @@
+import json
+import logging
+import math
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+_TIMEFRAME_STEPS = {
+    "Min": timedelta(minutes=1),
+    "Hour": timedelta(hours=1),
+    "Day": timedelta(days=1),
+    "Week": timedelta(weeks=1),
+}
+
+def _parse_time(value):
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return ts if ts.tzinfo else ts.replace(tzinfo=timezone.utc)
+
+def _timeframe_step(timeframe):
+    """Parse Alpaca timeframe strings such as 1Day, 15Min or 1Hour."""
+    for unit, step in _TIMEFRAME_STEPS.items():
+        if timeframe.endswith(unit):
+            return step * int(timeframe[:-len(unit)] or 1)
+    raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+def synthetic_bars(symbol, start, end, timeframe="1Day"):
+    """
+    Deterministic bars for a symbol: the same timestamp always gets the same
+    prices, so overlapping requests agree. Daily bars skip weekends and are
+    stamped 05:00 UTC like Alpaca's.
+    """
+    step = _timeframe_step(timeframe)
+    seed = zlib.crc32(symbol.encode()) % 1000
+    base = 50 + seed / 5
+    if step >= timedelta(days=1):
+        cursor = start.replace(hour=5, minute=0, second=0, microsecond=0)
+        if cursor < start:
+            cursor += timedelta(days=1)
+    else:
+        cursor = start
+    bars = []
+    while cursor <= end:
+        if step < timedelta(days=1) or cursor.weekday() < 5:
+            t = cursor.timestamp() / 86400
+            close = base * (1 + 0.15 * math.sin(t / 40 + seed) + 0.05 * math.sin(t / 7 + 2 * seed))
+            wiggle = (zlib.crc32(f"{symbol}{int(t * 1440)}".encode()) % 1000) / 1000 - 0.5
+            close *= 1 + 0.01 * wiggle
+            open_ = close * (1 - 0.004 * wiggle)
+            bars.append({
+                "t": cursor.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "o": round(open_, 4),
+                "h": round(max(open_, close) * 1.005, 4),
+                "l": round(min(open_, close) * 0.995, 4),
+                "c": round(close, 4),
+                "v": 1_000_000 + (zlib.crc32(f"v{symbol}{int(t)}".encode()) % 500_000),
+                "n": 5000,
+                "vw": round((open_ + close) / 2, 4),
+            })
+        cursor += step
+    return bars
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "MarketDataStandIn/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/stats":
+            self._send_json(200, dict(self.server.stats))
+            return
+        if url.path != "/v2/stocks/bars":
+            self._send_json(404, {"message": "not found"})
+            return
+
+        self.server.stats["requests"] += 1
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            symbols = [s for s in params["symbols"].split(",") if s]
+            start = _parse_time(params["start"])
+            end = _parse_time(params["end"]) if "end" in params else datetime.now(timezone.utc)
+            timeframe = params.get("timeframe", "1Day")
+            bars = {symbol: synthetic_bars(symbol, start, end, timeframe) for symbol in symbols}
+        except (KeyError, ValueError) as e:
+            self._send_json(422, {"message": f"invalid request: {e}"})
+            return
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self._send_json(200, {"bars": bars, "next_page_token": None})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+class MarketDataServer(ThreadingHTTPServer):
+    """
+    Local stand-in for Alpaca's historical bars endpoint (GET /v2/stocks/bars).
+
+    Serves deterministic synthetic bars so the data client, agents and
+    backtests can run without network access or API keys. Point the Alpaca
+    client at it with ALPACA_DATA_URL=http://127.0.0.1:<port>. Request counts
+    are available at GET /stats.
+
+    Args:
+        host (str, optional): Interface to bind
+        port (int, optional): Port to bind; 0 picks a free one
+        latency (float, optional): Seconds to delay each bars response
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.stats = {"requests": 0}
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_background(self):
+        """Serve from a daemon thread and return the base URL."""
+        threading.Thread(target=self.serve_forever, name="market-data-server", daemon=True).start()
+        return self.url
+
+### Run the Stand-in Server #####
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Serve synthetic bars in the Alpaca data API format')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8001, help='Port to bind (default: 8001)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to delay each response')
+
+    args = parser.parse_args()
+
+    server = MarketDataServer(args.host, args.port, args.latency)
+    print(f"Serving synthetic market data at {server.url} (set ALPACA_DATA_URL to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -1,16 +1,326 @@
 import asyncio
-from typing import Dict, List, Callable, Awaitable, Any
-import json
+import itertools
+from collections import deque
+from typing import Dict, List, Callable, Awaitable, Any, Iterable, Optional
 import logging
-from datetime import datetime
 from src.logging_config import setup_logging
+from src.clock import system_clock
+from src.bus_transport import LocalTransport
+from src.envelope import Envelope
+from src import offload
 
 # Initialize logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+def message_ticker(message: Envelope) -> Optional[str]:
+    """Ticker named in a message's content, if any"""
+    content = message.content
+    return content.get("ticker") if isinstance(content, dict) else None
+
+def message_sender(message: Envelope) -> str:
+    return message.sender
+
+def market_data_key(message: Envelope) -> Optional[str]:
+    """Conflation key for market_data: snapshots conflate per ticker, incremental updates never do"""
+    content = message.content
+    if isinstance(content, dict) and content.get("mode") == "append":
+        return None
+    return message_ticker(message)
+
+class QueuePolicy:
+    """
+    Capacity and overflow behaviour for one message type in a MessageQueue
+
+    Args:
+        capacity (int, optional): Maximum queued messages of this type; 0 means unbounded
+        policy (str, optional): What to do when the type is at capacity:
+            "block" waits for room, "drop_oldest" discards the oldest queued message
+            of the type, "conflate" additionally replaces a queued message with the
+            same key by the newer one
+        key (Callable, optional): Conflation key of a message. Defaults to its ticker.
+            Messages whose key is None are never conflated.
+    """
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    CONFLATE = "conflate"
+
+    __slots__ = ("capacity", "policy", "key")
+
+    def __init__(self, capacity: int = 0, policy: str = BLOCK, key: Optional[Callable[[Envelope], Any]] = None):
+        if policy not in (self.BLOCK, self.DROP_OLDEST, self.CONFLATE):
+            raise ValueError(f"Unknown queue policy: {policy}")
+        self.capacity = capacity
+        self.policy = policy
+        self.key = key or message_ticker
+
+# Priority classes, drained in this order
+PRIORITY_CRITICAL = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITY_LEVELS = 3
+
+# Default priority per message type; unlisted types are PRIORITY_NORMAL
+MESSAGE_PRIORITIES: Dict[str, int] = {
+    "trading_decision": PRIORITY_CRITICAL,
+    "risk_assessment": PRIORITY_CRITICAL,
+    "agent_thought": PRIORITY_LOW,
+    "agent_status": PRIORITY_LOW,
+    "chat": PRIORITY_LOW,
+}
+
+# Keep only the newest market data per ticker and status per agent; shed old thoughts
+DEFAULT_QUEUE_POLICIES: Dict[str, QueuePolicy] = {
+    "market_data": QueuePolicy(capacity=1000, policy=QueuePolicy.CONFLATE, key=market_data_key),
+    "agent_status": QueuePolicy(capacity=1000, policy=QueuePolicy.CONFLATE, key=message_sender),
+    "agent_thought": QueuePolicy(capacity=1000, policy=QueuePolicy.DROP_OLDEST),
+}
+
+class MessageQueue:
+    """
+    FIFO message queue with a capacity and overflow policy per message type
+
+    Message types without their own policy share the default policy's capacity.
+    The asyncio.Queue methods used by the bus (put, get, task_done, join, ...)
+    are provided, and the messages dropped or conflated away are counted per
+    type in ``dropped`` and ``conflated``.
+
+    With ``prioritized`` set, messages are served by their "priority" field:
+    the most urgent non-empty priority class goes first and is FIFO within
+    itself. A lower class that has been passed over more than
+    ``starvation_limit`` times in a row is served next, so chatter still moves
+    while critical traffic is flowing. Otherwise the queue is plain FIFO.
+
+    Args:
+        policies (Dict[str, QueuePolicy], optional): Policy per message type
+        default (QueuePolicy, optional): Policy for every other message type
+        starvation_limit (int, optional): Consecutive gets a non-empty lower priority
+            class may be skipped before it is served
+        prioritized (bool, optional): Serve by priority class; False keeps arrival order
+    """
+
+    def __init__(self, policies: Optional[Dict[str, QueuePolicy]] = None, default: Optional[QueuePolicy] = None,
+                 starvation_limit: int = 16, prioritized: bool = True):
+        self.policies = dict(policies or {})
+        self.default = default or QueuePolicy()
+        self.starvation_limit = starvation_limit
+        self.prioritized = prioritized
+        self.dropped: Dict[str, int] = {}
+        self.conflated: Dict[str, int] = {}
+        # Entries are [message, lane, conflation key, priority]. Served and dropped
+        # entries have message set to None and stay in the other deques (priority
+        # class or lane) until skipped there, since a lane mixes priorities and its
+        # entries are not necessarily served from the head.
+        self._entries = [deque() for _ in range(PRIORITY_LEVELS)]
+        self._live = [0] * PRIORITY_LEVELS
+        self._skipped = [0] * PRIORITY_LEVELS
+        self._lanes: Dict[Optional[str], deque] = {}
+        self._lane_sizes: Dict[Optional[str], int] = {}
+        self._keyed: Dict[tuple, list] = {}
+        self._size = 0
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._getters: deque = deque()
+        self._putters: deque = deque()
+
+    def qsize(self) -> int:
+        return self._size
+
+    def empty(self) -> bool:
+        return self._size == 0
+
+    def put_nowait(self, message: Envelope):
+        """Queue a message, applying its type's policy; raises asyncio.QueueFull if it would block"""
+        message_type = message.type
+        lane = message_type if message_type in self.policies else None
+        policy = self.policies[lane] if lane is not None else self.default
+
+        key = None
+        if policy.policy == QueuePolicy.CONFLATE:
+            message_key = policy.key(message)
+            if message_key is not None:
+                key = (lane, message_key)
+                entry = self._keyed.get(key)
+                if entry is not None:
+                    entry[0] = message
+                    self.conflated[message_type] = self.conflated.get(message_type, 0) + 1
+                    return
+
+        queue = self._lanes.setdefault(lane, deque())
+        if policy.capacity and self._lane_sizes.get(lane, 0) >= policy.capacity:
+            if policy.policy == QueuePolicy.BLOCK:
+                raise asyncio.QueueFull
+            self._discard(self._pop_live(queue))
+
+        priority = min(max(message.priority, 0), PRIORITY_LEVELS - 1) if self.prioritized else PRIORITY_NORMAL
+        entry = [message, lane, key, priority]
+        queue.append(entry)
+        self._lane_sizes[lane] = self._lane_sizes.get(lane, 0) + 1
+        self._entries[priority].append(entry)
+        self._live[priority] += 1
+        if key is not None:
+            self._keyed[key] = entry
+        self._size += 1
+        self._unfinished += 1
+        self._finished.clear()
+        self._wake(self._getters)
+
+    async def put(self, message: Envelope):
+        """Queue a message, waiting for room if its type blocks when full"""
+        while True:
+            try:
+                return self.put_nowait(message)
+            except asyncio.QueueFull:
+                await self._wait(self._putters)
+
+    def _next_priority(self) -> int:
+        """Pick the priority class to serve, protecting lower classes from starvation"""
+        waiting = [priority for priority in range(PRIORITY_LEVELS) if self._live[priority]]
+        chosen = waiting[0]
+        for priority in waiting[1:]:
+            self._skipped[priority] += 1
+            if self._skipped[priority] > self.starvation_limit and chosen == waiting[0]:
+                chosen = priority
+        self._skipped[chosen] = 0
+        return chosen
+
+    def get_nowait(self) -> Envelope:
+        if self._size == 0:
+            raise asyncio.QueueEmpty
+        priority = self._next_priority()
+        entries = self._entries[priority]
+        while True:
+            entry = entries.popleft()
+            message = entry[0]
+            if message is not None:
+                break
+        # Mark the entry served; its lane skips it when it reaches the head
+        entry[0] = None
+        lane = self._lanes[entry[1]]
+        while lane and lane[0][0] is None:
+            lane.popleft()
+        self._lane_sizes[entry[1]] -= 1
+        if entry[2] is not None:
+            del self._keyed[entry[2]]
+        self._live[priority] -= 1
+        self._size -= 1
+        # Room may have opened for any blocked lane
+        while self._putters:
+            self._wake(self._putters)
+        return message
+
+    async def get(self) -> Envelope:
+        while self.empty():
+            await self._wait(self._getters)
+        return self.get_nowait()
+
+    def task_done(self):
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self):
+        if self._unfinished:
+            await self._finished.wait()
+
+    @staticmethod
+    def _pop_live(lane: deque) -> list:
+        """Remove and return the oldest entry of a lane that is still queued"""
+        while True:
+            entry = lane.popleft()
+            if entry[0] is not None:
+                return entry
+
+    def _discard(self, entry: list):
+        message_type = entry[0].type
+        self.dropped[message_type] = self.dropped.get(message_type, 0) + 1
+        entry[0] = None
+        if entry[2] is not None:
+            del self._keyed[entry[2]]
+        self._lane_sizes[entry[1]] -= 1
+        self._live[entry[3]] -= 1
+        self._size -= 1
+        self.task_done()
+
+    @staticmethod
+    def _wake(waiters: deque):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    @staticmethod
+    async def _wait(waiters: deque):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in waiters:
+                waiters.remove(waiter)
+            raise
+
+class Subscription:
+    """
+    A subscriber callback, the messages it wants to receive and its delivery inbox
+
+    Each subscription is served by its own worker task reading a bounded
+    inbox, so a slow callback only delays its own messages. Inboxes are FIFO:
+    priorities only order the bus queue, so each subscriber sees messages in
+    the order the bus dispatched them.
+    """
+    __slots__ = ("callback", "channel", "message_types", "senders", "tickers", "inbox", "worker")
+
+    def __init__(self, callback: Callable, channel: str, message_types: Optional[Iterable[str]] = None,
+                 senders: Optional[Iterable[str]] = None, tickers: Optional[Iterable[str]] = None,
+                 inbox: Optional[MessageQueue] = None):
+        self.callback = callback
+        self.channel = channel
+        self.message_types = frozenset(message_types) if message_types is not None else None
+        self.senders = frozenset(senders) if senders is not None else None
+        self.tickers = frozenset(tickers) if tickers is not None else None
+        self.inbox = inbox or MessageQueue()
+        self.worker: Optional[asyncio.Task] = None
+
+    def accepts(self, message: Envelope) -> bool:
+        """Check the sender and ticker filters (the type is matched by the routing index)"""
+        if self.senders is not None and message.sender not in self.senders:
+            return False
+        if self.tickers is not None and message_ticker(message) not in self.tickers:
+            return False
+        return True
+
 class MessageBus:
-    def __init__(self):
+    def __init__(self, clock=None, inbox_size: int = 1000, queue_size: int = 10000,
+                 queue_policies: Optional[Dict[str, QueuePolicy]] = None, transport=None, journal=None):
+        """
+        Args:
+            clock (Clock, optional): Time source for message timestamps
+            inbox_size (int, optional): Default per-subscriber inbox capacity. When a
+                subscriber falls this far behind, its oldest undelivered message is dropped.
+            queue_size (int, optional): Capacity of the bus queue for message types without
+                their own policy; publishers wait when it is full
+            queue_policies (Dict[str, QueuePolicy], optional): Capacity and overflow policy per
+                message type, applied to the bus queue and to every subscriber inbox.
+                Defaults to DEFAULT_QUEUE_POLICIES.
+            transport (optional): Carries published messages to the bus queues. Defaults to
+                LocalTransport (this process only); a SocketTransport connects buses in
+                several processes through a BusHub.
+            journal (MessageJournal, optional): Records every dispatched message with a
+                sequence number for replay and warm restart
+        """
+        self.clock = clock or system_clock
+        self.transport = transport or LocalTransport()
+        self.transport.bus = self
+        self.journal = journal
+        self._compaction: Optional[asyncio.Future] = None
+        self._sequence = itertools.count(1)
+        self.inbox_size = inbox_size
+        self.queue_policies = dict(DEFAULT_QUEUE_POLICIES if queue_policies is None else queue_policies)
         self.subscribers: Dict[str, List[Callable]] = {
             'market_data': [],
             'quantitative': [],
@@ -18,23 +328,50 @@ class MessageBus:
             'portfolio_management': [],
             'ui': []
         }
-        self.message_queue: asyncio.Queue = asyncio.Queue()
+        self._subscriptions: List[Subscription] = []
+        # Routing index: message type -> subscriptions that declared it;
+        # subscriptions without declared types receive every type
+        self._routes: Dict[str, List[Subscription]] = {}
+        self._wildcard_routes: List[Subscription] = []
+        self.message_queue = MessageQueue(self.queue_policies, QueuePolicy(queue_size, QueuePolicy.BLOCK))
         self._running = False
+        self._dispatcher: Optional[asyncio.Task] = None
         logger.info("MessageBus initialized")
 
-    async def publish(self, sender: str, message_type: str, content: Any, private: bool = False):
-        """Publish a message to the bus"""
-        message = {
-            "sender": sender,
-            "type": message_type,
-            "content": content,
-            "timestamp": datetime.now().isoformat(),
-            "private": private
-        }
-        logger.debug(f"Publishing message: {message}")
-        await self.message_queue.put(message)
+    async def publish(self, sender: str, message_type: str, content: Any, private: bool = False,
+                      priority: Optional[int] = None):
+        """
+        Publish a message to the bus
+
+        Args:
+            priority (int, optional): PRIORITY_CRITICAL, PRIORITY_NORMAL or PRIORITY_LOW.
+                Defaults to the message type's entry in MESSAGE_PRIORITIES.
 
-    async def subscribe(self, callback: Callable, channel: str = 'ui'):
+        Returns:
+            Envelope: The published message, numbered by this bus's sequence
+        """
+        message = Envelope(
+            sender=sender,
+            type=message_type,
+            content=content,
+            timestamp=self.clock.time(),
+            private=private,
+            priority=MESSAGE_PRIORITIES.get(message_type, PRIORITY_NORMAL) if priority is None else priority,
+            seq=next(self._sequence)
+        )
+        logger.debug("Publishing message: %s", message)
+        await self.transport.send(message)
+        return message
+
+    async def use_transport(self, transport):
+        """Switch to another transport, e.g. a SocketTransport when agents move to worker processes"""
+        previous, self.transport = self.transport, transport
+        await previous.close()
+        await transport.connect(self)
+
+    async def subscribe(self, callback: Callable, channel: str = 'ui', message_types: Optional[Iterable[str]] = None,
+                        senders: Optional[Iterable[str]] = None, tickers: Optional[Iterable[str]] = None,
+                        inbox_size: Optional[int] = None):
         """
         Subscribe to a specific channel
         Normalize channel name to match predefined channels
@@ -42,6 +379,10 @@ class MessageBus:
         Args:
             callback (Callable): The callback function to handle messages
             channel (str, optional): The channel to subscribe to. Defaults to 'ui'.
+            message_types (Iterable[str], optional): Message types to receive. Defaults to all types.
+            senders (Iterable[str], optional): Only receive messages from these senders
+            tickers (Iterable[str], optional): Only receive messages whose content names one of these tickers
+            inbox_size (int, optional): Inbox capacity for this subscriber. Defaults to the bus setting.
         """
         # Normalize channel names
         normalized_channel = self._normalize_channel(channel)
@@ -52,8 +393,66 @@ class MessageBus:
             self.subscribers[normalized_channel] = []
         
         self.subscribers[normalized_channel].append(callback)
+        inbox = MessageQueue(
+            self.queue_policies,
+            QueuePolicy(self.inbox_size if inbox_size is None else inbox_size, QueuePolicy.DROP_OLDEST),
+            prioritized=False
+        )
+        subscription = Subscription(callback, normalized_channel, message_types, senders, tickers, inbox)
+        self._subscriptions.append(subscription)
+        self._rebuild_routes()
+        await self.transport.update_subscriptions(self.subscribed_message_types())
+        if self._running:
+            self._start_worker(subscription)
         logger.debug(f"Added subscriber for {normalized_channel}. Total subscribers: {len(self.subscribers[normalized_channel])}")
 
+    async def unsubscribe(self, callback: Callable, channel: str = 'ui'):
+        """Remove a callback previously registered with subscribe"""
+        normalized_channel = self._normalize_channel(channel)
+        if callback in self.subscribers.get(normalized_channel, []):
+            self.subscribers[normalized_channel].remove(callback)
+            for sub in self._subscriptions:
+                if sub.callback == callback and sub.channel == normalized_channel and sub.worker:
+                    sub.worker.cancel()
+            self._subscriptions = [
+                sub for sub in self._subscriptions
+                if not (sub.callback == callback and sub.channel == normalized_channel)
+            ]
+            self._rebuild_routes()
+            await self.transport.update_subscriptions(self.subscribed_message_types())
+            logger.debug(f"Removed subscriber for {normalized_channel}")
+
+    def _rebuild_routes(self):
+        """Precompute the message type -> subscriptions index"""
+        routes: Dict[str, List[Subscription]] = {}
+        wildcard = []
+        for sub in self._subscriptions:
+            if sub.message_types is None:
+                wildcard.append(sub)
+            else:
+                for message_type in sub.message_types:
+                    routes.setdefault(message_type, []).append(sub)
+        self._routes = routes
+        self._wildcard_routes = wildcard
+
+    def subscribed_message_types(self) -> Optional[List[str]]:
+        """Message types any local subscriber wants, or None if some subscriber takes every type"""
+        if self._wildcard_routes:
+            return None
+        return list(self._routes)
+
+    def _route(self, message: Envelope) -> List[Subscription]:
+        """Return the subscriptions interested in a message"""
+        candidates = self._routes.get(message.type, [])
+        if self._wildcard_routes:
+            candidates = candidates + self._wildcard_routes
+        if message.private:
+            # Private messages go to UI and the specific agent
+            allowed_channels = {"ui", self._normalize_channel(message.sender)}
+            return [sub for sub in candidates if sub.channel in allowed_channels and sub.accepts(message)]
+        # Public messages go to every interested subscriber
+        return [sub for sub in candidates if sub.accepts(message)]
+
     def _normalize_channel(self, channel: str) -> str:
         """
         Normalize channel names to match predefined channels
@@ -71,57 +470,147 @@ class MessageBus:
         """Start processing messages"""
         logger.info("Starting message bus")
         self._running = True
+        self._dispatcher = asyncio.current_task()
+        await self.transport.connect(self)
+        for sub in self._subscriptions:
+            self._start_worker(sub)
         while self._running:
             try:
                 message = await self.message_queue.get()
-                logger.debug(f"Processing message: {message}")
-                tasks = []
-                
-                # Determine recipients based on message privacy
-                if message["private"]:
-                    # Private messages go to UI and the specific agent
-                    recipients = ["ui"]
-                    if message["sender"] in self.subscribers:
-                        recipients.append(message["sender"])
-                    logger.debug(f"Private message recipients: {recipients}")
-                else:
-                    # Public messages go to everyone
-                    recipients = list(self.subscribers.keys())
-                    logger.debug(f"Public message recipients: {recipients}")
-
-                # Create tasks for each subscriber
-                for agent_type in recipients:
-                    subscriber_count = len(self.subscribers[agent_type])
-                    logger.debug(f"Sending to {agent_type} ({subscriber_count} subscribers)")
-                    for callback in self.subscribers[agent_type]:
-                        tasks.append(asyncio.create_task(self._safe_callback(callback, message)))
-
-                if tasks:
-                    await asyncio.gather(*tasks)
-                    logger.debug(f"Completed {len(tasks)} message deliveries")
+                logger.debug("Processing message: %s", message)
+                if self.journal is not None:
+                    self.journal.append(message)
+                    if self.journal.compaction_due and (self._compaction is None or self._compaction.done()):
+                        # Rewriting segments takes a while; keep it off the event loop
+                        self._compaction = asyncio.ensure_future(offload.run_io(self.journal.compact))
+                recipients = self._route(message)
+                for sub in recipients:
+                    await self._deliver(sub, message)
+                logger.debug(f"Queued message for {len(recipients)} subscribers")
                 
                 self.message_queue.task_done()
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logger.error(f"Error processing message: {e}", exc_info=True)
 
-    async def _safe_callback(self, callback: Callable, message: dict):
+    def _start_worker(self, sub: Subscription):
+        if sub.worker is None or sub.worker.done():
+            sub.worker = asyncio.create_task(self._subscriber_worker(sub))
+
+    async def _deliver(self, sub: Subscription, message: Envelope):
+        """
+        Put a message in a subscriber's inbox. Only message types configured to
+        block make the bus wait for a full subscriber; other types drop or
+        conflate inside the inbox instead.
+        """
+        try:
+            sub.inbox.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.warning(f"Inbox full for {sub.channel} subscriber, waiting to deliver {message.type}")
+            await sub.inbox.put(message)
+
+    async def _subscriber_worker(self, sub: Subscription):
+        """Deliver a subscriber's messages one at a time, preserving their order"""
+        while True:
+            try:
+                message = await sub.inbox.get()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Keep serving the subscriber; a dead worker would stall join() forever
+                logger.error(f"Error reading {sub.channel} inbox: {e}", exc_info=True)
+                await asyncio.sleep(0)
+                continue
+            try:
+                await self._safe_callback(sub.callback, message)
+            finally:
+                sub.inbox.task_done()
+
+    async def _safe_callback(self, callback: Callable, message: Envelope):
         """Safely execute a callback with error handling"""
         try:
             await callback(message)
         except Exception as e:
             logger.error(f"Error in subscriber callback: {e}", exc_info=True)
 
+    async def join(self):
+        """Wait until every published message has been delivered to every subscriber"""
+        while True:
+            await self.message_queue.join()
+            for sub in list(self._subscriptions):
+                await sub.inbox.join()
+            # Callbacks may have published more messages while we waited
+            if self.message_queue.empty() and all(sub.inbox.empty() for sub in self._subscriptions):
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and per-type drop and conflation counts for the bus queue and subscriber inboxes"""
+        dropped = dict(self.message_queue.dropped)
+        conflated = dict(self.message_queue.conflated)
+        for sub in self._subscriptions:
+            for counts, totals in ((sub.inbox.dropped, dropped), (sub.inbox.conflated, conflated)):
+                for message_type, count in counts.items():
+                    totals[message_type] = totals.get(message_type, 0) + count
+        return {
+            "queued": self.message_queue.qsize(),
+            "inboxed": sum(sub.inbox.qsize() for sub in self._subscriptions),
+            "dropped": dropped,
+            "conflated": conflated,
+        }
+
+    async def restore(self, from_seq: int = 0, message_types: Optional[Iterable[str]] = None) -> int:
+        """
+        Re-deliver journaled messages to the current subscribers, e.g. to rebuild
+        agent state after a restart or to feed recorded traffic to a test instance.
+
+        Args:
+            from_seq (int, optional): First sequence number to replay
+            message_types (Iterable[str], optional): Only replay these message types
+
+        Returns:
+            int: Number of messages replayed
+        """
+        if self.journal is None:
+            raise ValueError("MessageBus has no journal to restore from")
+        wanted = frozenset(message_types) if message_types is not None else None
+        count = 0
+        for _, _, message in self.journal.replay(from_seq):
+            if wanted is None or message.type in wanted:
+                # Deliver directly so restored messages are not journaled again
+                for sub in self._route(message):
+                    await self._deliver(sub, message)
+                count += 1
+        logger.info(f"Restored {count} journaled messages from sequence {from_seq}")
+        return count
+
     async def stop(self):
         """Stop processing messages"""
         logger.info("Stopping message bus")
-        self._running = False
         # Process remaining messages
         remaining = self.message_queue.qsize()
         if remaining > 0:
             logger.info(f"Processing {remaining} remaining messages")
-        while not self.message_queue.empty():
-            await asyncio.sleep(0.1)
+        if self._running:
+            await self.join()
+        self._running = False
+        for sub in self._subscriptions:
+            if sub.worker:
+                sub.worker.cancel()
+                sub.worker = None
+        if self._dispatcher and self._dispatcher is not asyncio.current_task():
+            self._dispatcher.cancel()
+        self._dispatcher = None
+        await self.transport.close()
+        if self._compaction is not None:
+            try:
+                await self._compaction
+            except Exception as e:
+                logger.error(f"Journal compaction failed: {e}")
+            self._compaction = None
+        if self.journal is not None:
+            self.journal.flush()
         logger.info("Message bus stopped")
 
 # Global message bus instance
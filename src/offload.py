@@ -0,0 +1,152 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# "process" runs compute work in worker processes, "thread" in threads of this process
+COMPUTE_POOL = os.getenv('AGENT_COMPUTE_POOL', 'process')
+COMPUTE_WORKERS = int(os.getenv('AGENT_COMPUTE_WORKERS', '0')) or max(1, (os.cpu_count() or 2) // 2)
+IO_THREADS = int(os.getenv('AGENT_IO_THREADS', '8'))
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_compute_executor: Optional[Executor] = None
+
+# Per-function call counts and seconds spent off the event loop
+offload_stats: Dict[str, Dict[str, float]] = {}
+
+def configure(compute_pool: Optional[str] = None, compute_workers: Optional[int] = None):
+    """
+    Change the compute pool settings before first use (an existing pool is shut down).
+
+    Args:
+        compute_pool (str, optional): "process" or "thread"
+        compute_workers (int, optional): Pool size
+    """
+    global COMPUTE_POOL, COMPUTE_WORKERS, _compute_executor
+    if compute_pool is not None:
+        if compute_pool not in ("process", "thread"):
+            raise ValueError(f"Unknown compute pool: {compute_pool}")
+        COMPUTE_POOL = compute_pool
+    if compute_workers is not None:
+        COMPUTE_WORKERS = compute_workers
+    if _compute_executor is not None:
+        _compute_executor.shutdown(wait=False)
+        _compute_executor = None
+
+def io_executor() -> ThreadPoolExecutor:
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="agent-io")
+    return _io_executor
+
+def compute_executor() -> Executor:
+    global _compute_executor
+    if _compute_executor is None:
+        if COMPUTE_POOL == "process":
+            _compute_executor = ProcessPoolExecutor(
+                max_workers=COMPUTE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        else:
+            _compute_executor = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix="agent-compute")
+    return _compute_executor
+
+def _record(func: Callable, seconds: float):
+    name = getattr(func, "__qualname__", repr(func))
+    stats = offload_stats.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+    stats["calls"] += 1
+    stats["seconds"] += seconds
+    stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """Run blocking I/O (e.g. a synchronous HTTP client) in the shared thread pool."""
+    started = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(io_executor(), functools.partial(func, *args, **kwargs))
+    finally:
+        _record(func, time.perf_counter() - started)
+
+async def run_compute(func: Callable, *args, **kwargs) -> Any:
+    """
+    Run CPU-bound work in the compute pool. With the process pool, func and
+    its arguments must be picklable (a module-level function).
+    """
+    started = time.perf_counter()
+    call = functools.partial(func, *args, **kwargs)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(compute_executor(), call)
+    except BrokenProcessPool:
+        logger.error("Compute process pool broke, switching to threads")
+        configure(compute_pool="thread")
+        return await loop.run_in_executor(compute_executor(), call)
+    finally:
+        _record(func, time.perf_counter() - started)
+
+def shutdown():
+    """Shut down both pools."""
+    global _io_executor, _compute_executor
+    for executor in (_io_executor, _compute_executor):
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+    _io_executor = None
+    _compute_executor = None
+
+class LoopMonitor:
+    """
+    Measures how long the event loop is blocked.
+
+    A task sleeps for ``interval`` seconds of wall-clock time and records
+    how late it wakes up; the delay is time the loop spent running other
+    code without yielding. Stalls longer than ``threshold`` are logged.
+
+    Args:
+        interval (float, optional): Seconds between samples
+        threshold (float, optional): Lag in seconds above which a warning is logged
+    """
+
+    def __init__(self, interval: float = 0.5, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = 0
+        self.total_blocked = 0.0
+        self.max_blocked = 0.0
+        self.stalls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(time.perf_counter() - expected, 0.0)
+            self.samples += 1
+            self.total_blocked += lag
+            self.max_blocked = max(self.max_blocked, lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Loop lag summary plus per-function offload timings"""
+        return {
+            "samples": self.samples,
+            "total_blocked_seconds": self.total_blocked,
+            "max_blocked_seconds": self.max_blocked,
+            "stalls": self.stalls,
+            "offloaded": {name: dict(stats) for name, stats in offload_stats.items()},
+        }
@@ -0,0 +1,119 @@
+import math
+
+import numpy as np
+
+TRADING_DAYS_PER_YEAR = 252
+
+class PerformanceAccumulator:
+    """
+    Streaming portfolio performance metrics with O(1) memory per metric.
+
+    The backtest loop calls ``update`` once per step (or ``update_batch`` for
+    a vectorized run). Returns feed a running mean/variance (Welford, merged
+    with Chan's formula for batches), the portfolio value feeds a running
+    peak and maximum drawdown, and traded and position values accumulate
+    into turnover and exposure. Nothing is stored per step.
+
+    Args:
+        initial_capital (float): Starting portfolio value
+        periods_per_year (int, optional): Used to annualize return volatility and Sharpe
+    """
+
+    def __init__(self, initial_capital, periods_per_year=TRADING_DAYS_PER_YEAR):
+        self.initial_capital = initial_capital
+        self.periods_per_year = periods_per_year
+        self.n_periods = 0
+        self.last_value = None
+        # Returns
+        self.n_returns = 0
+        self.mean_return = 0.0
+        self.m2_return = 0.0
+        # Drawdown
+        self.peak_value = -math.inf
+        self.max_drawdown = 0.0
+        # Turnover and exposure
+        self.total_traded = 0.0
+        self.value_sum = 0.0
+        self.exposure_sum = 0.0
+
+    def update(self, portfolio_value, position_value=0.0, traded_value=0.0):
+        """Absorb one step: portfolio value after the step, value held in positions and value traded."""
+        if self.last_value:
+            ret = portfolio_value / self.last_value - 1
+            self.n_returns += 1
+            delta = ret - self.mean_return
+            self.mean_return += delta / self.n_returns
+            self.m2_return += delta * (ret - self.mean_return)
+        self.last_value = portfolio_value
+        self.n_periods += 1
+
+        self.peak_value = max(self.peak_value, portfolio_value)
+        if self.peak_value > 0:
+            self.max_drawdown = min(self.max_drawdown, portfolio_value / self.peak_value - 1)
+
+        self.total_traded += abs(traded_value)
+        self.value_sum += portfolio_value
+        if portfolio_value:
+            self.exposure_sum += position_value / portfolio_value
+
+    def update_batch(self, portfolio_values, position_values=None, traded_values=None):
+        """Absorb a block of steps at once with array operations."""
+        values = np.asarray(portfolio_values, dtype=float)
+        if len(values) == 0:
+            return
+        position_values = np.zeros(len(values)) if position_values is None else np.asarray(position_values, dtype=float)
+        traded_values = np.zeros(len(values)) if traded_values is None else np.asarray(traded_values, dtype=float)
+
+        chain = values if not self.last_value else np.concatenate([[self.last_value], values])
+        returns = chain[1:] / chain[:-1] - 1
+        if len(returns):
+            n_b = len(returns)
+            mean_b = returns.mean()
+            m2_b = ((returns - mean_b) ** 2).sum()
+            n = self.n_returns + n_b
+            delta = mean_b - self.mean_return
+            self.mean_return += delta * n_b / n
+            self.m2_return += m2_b + delta ** 2 * self.n_returns * n_b / n
+            self.n_returns = n
+        self.last_value = values[-1]
+        self.n_periods += len(values)
+
+        peaks = np.maximum.accumulate(np.concatenate([[self.peak_value], values]))[1:]
+        self.peak_value = peaks[-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdowns = np.where(peaks > 0, values / peaks - 1, 0.0)
+            exposure = np.where(values != 0, position_values / values, 0.0)
+        self.max_drawdown = min(self.max_drawdown, drawdowns.min())
+
+        self.total_traded += np.abs(traded_values).sum()
+        self.value_sum += values.sum()
+        self.exposure_sum += exposure.sum()
+
+    def summary(self):
+        """Current metrics as a dict."""
+        std = math.sqrt(self.m2_return / (self.n_returns - 1)) if self.n_returns > 1 else 0.0
+        annualization = math.sqrt(self.periods_per_year)
+        final_value = self.last_value if self.last_value is not None else self.initial_capital
+        mean_value = self.value_sum / self.n_periods if self.n_periods else 0.0
+        return {
+            "total_return": (final_value - self.initial_capital) / self.initial_capital,
+            "annualized_volatility": std * annualization,
+            "sharpe_ratio": self.mean_return / std * annualization if std > 0 else 0.0,
+            "max_drawdown": self.max_drawdown,
+            "turnover": self.total_traded / mean_value if mean_value else 0.0,
+            "average_exposure": self.exposure_sum / self.n_periods if self.n_periods else 0.0,
+            "periods": self.n_periods,
+        }
+
+def save_performance_plot(performance_df, path):
+    """Write the portfolio value chart to an image file (no display needed)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    performance_df["Portfolio Value"].plot(ax=ax, title="Portfolio Value Over Time")
+    ax.set_ylabel("Portfolio Value ($)")
+    ax.set_xlabel("Date")
+    fig.savefig(path)
+    plt.close(fig)
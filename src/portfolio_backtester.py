@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import logging
+
+from src.backtester import (
+    DEFAULT_STRATEGY_PARAMS,
+    LOOKBACK_DAYS,
+    _ffill,
+    apply_stop_loss,
+    rule_target_weights,
+    signal_counts_from_indicators,
+    strategy_indicator_spec,
+)
+from src.performance import PerformanceAccumulator
+from src.tools import compute_panel_indicators, get_price_panel
+
+class PortfolioBacktester:
+    """
+    Multi-asset backtester over an aligned (symbols x time) price matrix.
+
+    Per-asset positions live in a NumPy array next to a single cash ledger.
+    Each step revalues the portfolio and rebalances every asset to its rule
+    based target weight in one vectorized update, so the daily loop has no
+    per-symbol Python code.
+    """
+
+    def __init__(self, tickers, start_date, end_date, initial_capital, strategy_params=None):
+        self.tickers = list(tickers)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.initial_capital = initial_capital
+        self.strategy_params = {**DEFAULT_STRATEGY_PARAMS, **(strategy_params or {})}
+        self.positions = np.zeros(len(self.tickers))
+        self.cash = float(initial_capital)
+        self.portfolio_values = []
+        self.metrics = PerformanceAccumulator(initial_capital)
+        self.logger = logging.getLogger(__name__)
+        self._panel = None
+
+    def load_history(self):
+        """Fetch every symbol's range plus warm-up in a single multi-symbol request."""
+        warmup_start = (pd.Timestamp(self.start_date) - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        self.set_history(get_price_panel(self.tickers, warmup_start, self.end_date))
+
+    def set_history(self, panel):
+        """Use an already loaded panel (see src.tools.prices_to_panel)."""
+        self._panel = {
+            field: frame.reindex(self.tickers)
+            for field, frame in panel.items()
+        }
+
+    def target_weights(self):
+        """
+        Rule-based target weight per asset and bar, scaled so that the total
+        never exceeds the portfolio value.
+        """
+        params = self.strategy_params
+        close = self._panel["close"].to_numpy(dtype=float)
+        indicators = compute_panel_indicators(self._panel, strategy_indicator_spec(params))
+        bullish, bearish = signal_counts_from_indicators(indicators, close)
+        _, weights = rule_target_weights(bullish, bearish, params["max_position_size"])
+        return weights
+
+    def run_backtest(self):
+        """
+        Simulate the portfolio over the requested range.
+
+        Assets without a price on a given bar keep their position and are
+        valued at their last known price. Weights are non-negative and scaled
+        to fit the tradable part of the portfolio, so cash never goes negative
+        and no asset is sold short.
+
+        Returns:
+            pd.DataFrame: Per-day cash, invested value and portfolio value
+        """
+        if self._panel is None:
+            self.load_history()
+
+        timestamps = pd.DatetimeIndex(self._panel["close"].columns)
+        if timestamps.tz is None:
+            timestamps = timestamps.tz_localize("UTC")
+        weights = self.target_weights()
+        raw_prices = self._panel["close"].to_numpy(dtype=float)
+
+        # Only trade inside the requested range; earlier bars are warm-up
+        start_ns = pd.Timestamp(self.start_date, tz="UTC").value
+        end_ns = pd.Timestamp(self.end_date, tz="UTC").value
+        ns = timestamps.tz_convert("UTC").asi8
+        lo = np.searchsorted(ns, start_ns, side="left")
+        hi = np.searchsorted(ns, end_ns, side="right")
+
+        tradable = ~np.isnan(raw_prices[:, lo:hi])
+        prices = _ffill(raw_prices)[:, lo:hi]
+        weights = apply_stop_loss(weights[:, lo:hi], prices, self.strategy_params["stop_loss"])
+        weights = np.where(tradable, weights, 0.0)
+
+        n_steps = hi - lo
+        cash = np.empty(n_steps)
+        invested = np.empty(n_steps)
+        positions = self.positions
+        for t in range(n_steps):
+            price = prices[:, t]
+            can_trade = tradable[:, t]
+            held_value = np.where(np.isnan(price), 0.0, positions * price)
+            total_value = self.cash + held_value.sum()
+
+            # Frozen positions (no price this bar) stay as they are
+            frozen_value = held_value[~can_trade].sum()
+            target = weights[:, t]
+            budget = max(total_value - frozen_value, 0.0)
+            scale = min(1.0, budget / (target.sum() * total_value)) if target.sum() > 0 and total_value > 0 else 1.0
+            with np.errstate(divide="ignore", invalid="ignore"):
+                target_positions = np.where(can_trade, target * scale * total_value / price, positions)
+            trades = np.where(can_trade, (target_positions - positions) * price, 0.0)
+            self.cash -= trades.sum()
+            positions = target_positions
+
+            invested[t] = np.where(np.isnan(price), 0.0, positions * price).sum()
+            cash[t] = self.cash
+            self.metrics.update(self.cash + invested[t], invested[t], np.abs(trades).sum())
+
+        self.positions = positions
+        dates = timestamps[lo:hi].tz_convert(None).normalize()
+        results = pd.DataFrame({
+            "Cash": cash,
+            "Invested": invested,
+            "Portfolio Value": cash + invested,
+        }, index=pd.Index(dates, name="Date"))
+        self.portfolio_values = [
+            {"Date": date, "Portfolio Value": value}
+            for date, value in zip(dates, results["Portfolio Value"])
+        ]
+        return results
+
+    def holdings(self):
+        """Current per-asset positions as a Series indexed by ticker."""
+        return pd.Series(self.positions, index=self.tickers, name="Shares")
+
+### Run the Portfolio Backtest #####
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a multi-asset portfolio backtest')
+    parser.add_argument('--tickers', type=str, required=True, help='Comma-separated ticker symbols (e.g., AAPL,MSFT,SPY)')
+    parser.add_argument('--end_date', type=str, default=datetime.now().strftime('%Y-%m-%d'), help='End date in YYYY-MM-DD format')
+    parser.add_argument('--start_date', type=str, default=(datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d'), help='Start date in YYYY-MM-DD format')
+    parser.add_argument('--initial_capital', type=float, default=100000, help='Initial capital amount (default: 100000)')
+
+    args = parser.parse_args()
+
+    backtester = PortfolioBacktester(
+        tickers=[t.strip().upper() for t in args.tickers.split(",") if t.strip()],
+        start_date=args.start_date,
+        end_date=args.end_date,
+        initial_capital=args.initial_capital,
+    )
+    results = backtester.run_backtest()
+    print(results.tail())
+    print(backtester.holdings())
@@ -0,0 +1,119 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from src.clock import VirtualClock
+from src.message_bus import message_bus
+from src.trading_system import TradingSystem
+
+logger = logging.getLogger(__name__)
+
+class ReplayDriver:
+    """
+    Replay historical bars through the live agent stack on a virtual clock.
+
+    Bars are fed to MarketDataAgent through its price_source, so each fetch
+    only sees bars up to the current virtual time. After moving the clock to
+    a bar (firing due agent timers once), the driver advances it in small
+    steps, each time waiting until every agent is idle, the timer scheduler
+    is parked and the message bus is drained. Virtual time therefore moves
+    as fast as the agents can process.
+
+    Args:
+        bars (pd.DataFrame): Bars for a single ticker, indexed by timestamp or by
+            Alpaca's (symbol, timestamp) MultiIndex
+        ticker (str): Symbol the bars belong to
+        trading_system (TradingSystem, optional): Stack to drive; one is created on
+            the driver's clock if omitted
+        settle_ticks (int, optional): Clock steps to advance after each bar, for
+            timers that fire shortly after a bar
+    """
+
+    def __init__(self, bars, ticker, trading_system=None, bus=message_bus, settle_ticks=5, tick_seconds=1.0):
+        self.bars = bars
+        self.ticker = ticker
+        self.bus = bus
+        self.settle_ticks = settle_ticks
+        self.tick_seconds = tick_seconds
+
+        index = bars.index.get_level_values(-1) if isinstance(bars.index, pd.MultiIndex) else bars.index
+        index = pd.DatetimeIndex(index)
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        self._timestamps = index.tz_convert("UTC")
+        self._epochs = self._timestamps.asi8 / 1e9
+
+        self.clock = VirtualClock(start=self._epochs[0] - 1 if len(self._epochs) else 0.0)
+        self.trading_system = trading_system or TradingSystem(clock=self.clock)
+        self.trading_system.scheduler.clock = self.clock
+        for agent in self.trading_system.agents.values():
+            agent.clock = self.clock
+        self.bus.clock = self.clock
+        self.decisions = []
+
+    async def _price_source(self, ticker, start_date, end_date):
+        """Stand-in for get_prices that only returns bars visible at the current virtual time."""
+        lo = np.searchsorted(self._epochs, pd.Timestamp(start_date, tz="UTC").value / 1e9, side="left")
+        hi = np.searchsorted(self._epochs, self.clock.time(), side="right")
+        visible = self.bars.iloc[lo:hi]
+        if len(visible) == 0:
+            raise ValueError(f"No price data returned for {ticker}")
+        return visible
+
+    async def _record(self, message: dict):
+        if message.get("type") == "trading_decision":
+            self.decisions.append({"bar_time": self.clock.now(), **message["content"]})
+
+    async def _wait_idle(self):
+        """Wait until no agent has work pending, timers are parked and the bus is drained."""
+        agents = self.trading_system.agents.values()
+        while True:
+            await self.bus.join()
+            if (self.trading_system.scheduler.idle and not any(agent.busy for agent in agents)
+                    and self.bus.message_queue.empty()):
+                return
+            await asyncio.sleep(0)
+
+    async def run(self):
+        """
+        Replay every bar and return the trading decisions made along the way.
+
+        Returns:
+            list: Trading decision dicts, each tagged with the virtual bar time
+        """
+        market_data_agent = self.trading_system.agents["market_data"]
+        market_data_agent.price_source = self._price_source
+        market_data_agent.market_data.update({
+            "tickers": [self.ticker],
+            "start_date": self._timestamps[0].strftime("%Y-%m-%d"),
+            "end_date": (self._timestamps[-1] + timedelta(days=1)).strftime("%Y-%m-%d"),
+        })
+
+        bus_task = None
+        if not self.bus._running:
+            bus_task = asyncio.create_task(self.bus.start())
+        await self.bus.subscribe(self._record, 'ui')
+
+        try:
+            await self.trading_system.start()
+            await self._wait_idle()
+            for epoch in self._epochs:
+                await self.clock.jump_to(epoch)
+                # A new bar is visible; let the market data agent pick it up
+                market_data_agent.wake()
+                await self._wait_idle()
+                for _ in range(self.settle_ticks):
+                    await self.clock.advance(self.tick_seconds)
+                    await self._wait_idle()
+        finally:
+            await self.trading_system.stop()
+            await self.bus.join()
+            await self.bus.unsubscribe(self._record, 'ui')
+            if bus_task is not None:
+                await self.bus.stop()
+
+        logger.info(f"Replayed {len(self._epochs)} bars for {self.ticker}: {len(self.decisions)} trading decisions")
+        return self.decisions
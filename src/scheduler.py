@@ -0,0 +1,110 @@
+import asyncio
+import heapq
+import itertools
+import logging
+from typing import Callable, Optional
+
+from src.clock import system_clock
+
+logger = logging.getLogger(__name__)
+
+class Timer:
+    """Handle for a scheduled callback; cancel() stops further calls."""
+    __slots__ = ("callback", "interval", "cancelled")
+
+    def __init__(self, callback: Callable[[], None], interval: Optional[float] = None):
+        self.callback = callback
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+class TimerScheduler:
+    """
+    Timers shared by all agents, driven by a single task.
+
+    The driver sleeps on the clock until the earliest deadline, runs the due
+    callbacks and goes back to sleep, so with no timers due nothing wakes up.
+    Periodic timers that were skipped over (e.g. by VirtualClock.jump_to)
+    fire once and continue one interval after the current time.
+
+    Callbacks are plain functions and should only schedule work, e.g. set an
+    agent's wakeup event.
+
+    Args:
+        clock (Clock, optional): Time source; a VirtualClock drives timers in replay
+    """
+
+    def __init__(self, clock=None):
+        self.clock = clock or system_clock
+        self._timers = []
+        self._counter = itertools.count()
+        self._driver: Optional[asyncio.Task] = None
+        self._sleep: Optional[asyncio.Future] = None
+
+    @property
+    def idle(self) -> bool:
+        """True when the driver is parked until the next deadline (or there is nothing to run)."""
+        if self._driver is None or self._driver.done():
+            return not self._timers
+        return self._sleep is not None and not self._sleep.done()
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> Timer:
+        """Call callback once after delay seconds."""
+        timer = Timer(callback)
+        self._push(self.clock.time() + delay, timer)
+        return timer
+
+    def call_every(self, interval: float, callback: Callable[[], None], first_delay: Optional[float] = None) -> Timer:
+        """Call callback every interval seconds, first after first_delay (default: one interval)."""
+        timer = Timer(callback, interval)
+        self._push(self.clock.time() + (interval if first_delay is None else first_delay), timer)
+        return timer
+
+    def _push(self, deadline: float, timer: Timer):
+        earliest = self._timers[0][0] if self._timers else None
+        heapq.heappush(self._timers, (deadline, next(self._counter), timer))
+        if self._driver is None or self._driver.done():
+            self._driver = asyncio.get_running_loop().create_task(self._drive())
+        elif earliest is None or deadline < earliest:
+            # Wake the driver so it sleeps until the new, earlier deadline
+            if self._sleep is not None:
+                self._sleep.cancel()
+
+    async def _drive(self):
+        while self._timers:
+            delay = self._timers[0][0] - self.clock.time()
+            if delay > 0:
+                self._sleep = asyncio.ensure_future(self.clock.sleep(delay))
+                # wait() returns when the sleep ends or is cancelled by an earlier timer
+                await asyncio.wait({self._sleep})
+                continue
+
+            now = self.clock.time()
+            while self._timers and self._timers[0][0] <= now:
+                deadline, _, timer = heapq.heappop(self._timers)
+                if timer.cancelled:
+                    continue
+                try:
+                    timer.callback()
+                except Exception as e:
+                    logger.error(f"Error in scheduled callback: {e}", exc_info=True)
+                if timer.interval and not timer.cancelled:
+                    next_deadline = deadline + timer.interval
+                    if next_deadline <= now:
+                        next_deadline = now + timer.interval
+                    heapq.heappush(self._timers, (next_deadline, next(self._counter), timer))
+        self._sleep = None
+
+    def stop(self):
+        """Cancel every timer and the driver task."""
+        for _, _, timer in self._timers:
+            timer.cancel()
+        self._timers = []
+        if self._sleep is not None:
+            self._sleep.cancel()
+            self._sleep = None
+        if self._driver is not None:
+            self._driver.cancel()
+            self._driver = None
@@ -6,8 +6,12 @@ import json
 import asyncio
 from typing import Dict
 import logging
+import os
+from src.envelope import Envelope
 from src.message_bus import message_bus
-from src.trading_system import TradingSystem
+from src.journal import MessageJournal
+from src import offload
+from src.trading_system import RESTORE_MESSAGE_TYPES, TradingSystem
 from datetime import datetime
 from src.logging_config import setup_logging
 
@@ -22,8 +26,20 @@ app = FastAPI()
 static_path = Path(__file__).parent / "static"
 app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
 
-# Initialize trading system
-trading_system = TradingSystem()
+# Record bus traffic for replay and warm restart when a journal directory is configured
+if os.getenv("BUS_JOURNAL_DIR"):
+    message_bus.journal = MessageJournal()
+# Replay the journaled market data and analyses into the agents when they first start;
+# BUS_JOURNAL_RESTORE=false only records
+journal_restore = (message_bus.journal is not None
+                   and os.getenv("BUS_JOURNAL_RESTORE", "true").lower() in ("1", "true", "yes"))
+
+# Initialize trading system; AGENT_PROCESSES=true runs each agent in its own process
+trading_system = TradingSystem(
+    multiprocess=os.getenv("AGENT_PROCESSES", "false").lower() in ("1", "true", "yes"),
+    bus_address=os.getenv("BUS_ADDRESS") or None,
+    restore_types=RESTORE_MESSAGE_TYPES if journal_restore else None
+)
 
 # WebSocket connection manager
 class ConnectionManager:
@@ -59,11 +75,13 @@ class ConnectionManager:
         except Exception as e:
             logger.error(f"Error disconnecting client {client_id}: {e}")
 
-    async def broadcast(self, message: dict):
+    async def broadcast(self, message):
         try:
+            # Encode once for all clients; bus envelopes reuse their cached encoding
+            text = message.text if isinstance(message, Envelope) else json.dumps(message)
             for client_id, connection in list(self.active_connections.items()):
                 try:
-                    await connection.send_json(message)
+                    await connection.send_text(text)
                 except Exception as e:
                     logger.error(f"Error sending message to client {client_id}: {e}")
                     await self.disconnect(client_id)
@@ -78,9 +96,9 @@ class ConnectionManager:
             logger.error(f"Error sending private message to client {client_id}: {e}")
             await self.disconnect(client_id)
 
-    async def _handle_message(self, message: dict):
+    async def _handle_message(self, message: Envelope):
         try:
-            logger.debug(f"Handling message from bus: {message}")
+            logger.debug("Handling message from bus: %s", message)
             # Broadcast all messages from the bus to WebSocket clients
             await self.broadcast(message)
         except Exception as e:
@@ -199,6 +217,9 @@ async def shutdown_event():
     await message_bus.stop()
     if manager.system_running:
         await trading_system.stop()
+    if message_bus.journal is not None:
+        message_bus.journal.close()
+    offload.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
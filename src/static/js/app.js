@@ -187,7 +187,8 @@ function createMessageElement(message) {
 }
 
 function formatTimestamp(timestamp) {
-    return new Date(timestamp).toLocaleTimeString();
+    // Bus messages carry epoch seconds; locally created ones use ISO strings
+    return (typeof timestamp === 'number' ? new Date(timestamp * 1000) : new Date(timestamp)).toLocaleTimeString();
 }
 
 // Agent Thought Management
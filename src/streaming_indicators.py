@@ -0,0 +1,312 @@
+"""
+Incremental (streaming) versions of the technical indicators in src.tools.
+
+Each indicator keeps just enough state to absorb one new bar in O(1) time
+instead of recomputing over the full history. The update rules mirror the
+ones pandas uses for ewm(adjust=False), rolling().mean() and rolling().std(),
+so warm-starting from a history frame yields the same values as
+calculate_macd, calculate_rsi, calculate_bollinger_bands and calculate_obv.
+"""
+from abc import ABC, abstractmethod
+from collections import deque
+import math
+
+import pandas as pd
+
+class _EMA:
+    """Exponential moving average, equivalent to ewm(span=span, adjust=False).mean()."""
+
+    def __init__(self, span):
+        com = (span - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt = 1.0 - self.alpha
+        self.value = math.nan
+
+    def update(self, x):
+        if self.value != self.value:
+            # No observation yet (or only NaNs so far)
+            self.value = x
+        elif x == x and self.value != x:
+            self.value = (self.old_wt * self.value + self.alpha * x) / (self.old_wt + self.alpha)
+        return self.value
+
+class _RollingMean:
+    """Fixed-window mean using pandas' compensated add/remove running sum."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.neg_ct = 0
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = math.nan
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        if val == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def update(self, val):
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(val)
+        self._add(val)
+
+        if len(self.values) < self.window or self.nobs == 0 or self.nobs < self.window:
+            return math.nan
+        result = self.sum_x / self.nobs
+        if self.num_consecutive_same_value >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+class _RollingStd:
+    """Fixed-window sample standard deviation (ddof=1) using Welford updates."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = math.nan
+
+    def _add(self, val):
+        if val != val:
+            return
+        if val == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = val
+        self.nobs += 1
+        prev_mean = self.mean_x - self.compensation_add
+        y = val - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.compensation_remove
+            y = val - self.compensation_remove
+            t = y - self.mean_x
+            self.compensation_remove = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def update(self, val):
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(val)
+        self._add(val)
+
+        if self.nobs < self.window or self.nobs <= 1:
+            return math.nan
+        if self.num_consecutive_same_value >= self.nobs:
+            return 0.0
+        return math.sqrt(max(self.ssqdm_x / (self.nobs - 1), 0.0))
+
+class StreamingIndicator(ABC):
+    """
+    Base class for incremental indicators.
+
+    Subclasses declare the bar fields they consume in ``fields`` and implement
+    ``_step`` to absorb one bar and return the updated value.
+    """
+
+    fields = ("close",)
+
+    def __init__(self):
+        self.value = None
+
+    @abstractmethod
+    def _step(self, *args):
+        """Absorb one bar's field values and return the updated indicator value."""
+
+    def update(self, bar):
+        """
+        Absorb one bar and return the updated indicator value.
+
+        Args:
+            bar: Mapping with the fields in ``fields`` (e.g. a price record dict
+                or a DataFrame row)
+        """
+        self.value = self._step(*(float(bar[f]) for f in self.fields))
+        return self.value
+
+    def update_many(self, bars):
+        """
+        Absorb a batch of bars in order.
+
+        Args:
+            bars: DataFrame or iterable of bar mappings
+
+        Returns:
+            list: Indicator value after each bar
+        """
+        if isinstance(bars, pd.DataFrame):
+            columns = [bars[f].to_numpy(dtype=float) for f in self.fields]
+            results = [self._step(*row) for row in zip(*columns)]
+        else:
+            results = [self._step(*(float(bar[f]) for f in self.fields)) for bar in bars]
+        if results:
+            self.value = results[-1]
+        return results
+
+    @classmethod
+    def from_history(cls, prices_df, **params):
+        """Create an indicator warm-started from a history DataFrame."""
+        indicator = cls(**params)
+        indicator.update_many(prices_df)
+        return indicator
+
+class StreamingMACD(StreamingIndicator):
+    """Incremental calculate_macd. Values are (macd_line, signal_line) tuples."""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        super().__init__()
+        self._fast = _EMA(fast)
+        self._slow = _EMA(slow)
+        self._signal = _EMA(signal)
+
+    def _step(self, close):
+        macd_line = self._fast.update(close) - self._slow.update(close)
+        return macd_line, self._signal.update(macd_line)
+
+class StreamingRSI(StreamingIndicator):
+    """Incremental calculate_rsi using rolling sums of gains and losses."""
+
+    def __init__(self, period=14):
+        super().__init__()
+        self._gain = _RollingMean(period)
+        self._loss = _RollingMean(period)
+        self._prev_close = math.nan
+
+    def _step(self, close):
+        delta = close - self._prev_close
+        self._prev_close = close
+        avg_gain = self._gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self._loss.update(-delta if delta < 0 else 0.0)
+
+        if avg_gain != avg_gain or avg_loss != avg_loss:
+            return math.nan
+        if avg_loss == 0:
+            # Match NumPy/pandas division semantics: x/0 -> inf, 0/0 -> NaN
+            return 100.0 if avg_gain > 0 else math.nan
+        return 100 - (100 / (1 + avg_gain / avg_loss))
+
+class StreamingBollingerBands(StreamingIndicator):
+    """Incremental calculate_bollinger_bands. Values are (upper_band, lower_band) tuples."""
+
+    def __init__(self, window=20, num_std=2):
+        super().__init__()
+        self.num_std = num_std
+        self._mean = _RollingMean(window)
+        self._std = _RollingStd(window)
+
+    def _step(self, close):
+        sma = self._mean.update(close)
+        std_dev = self._std.update(close)
+        return sma + (std_dev * self.num_std), sma - (std_dev * self.num_std)
+
+class StreamingOBV(StreamingIndicator):
+    """Incremental calculate_obv as a running total."""
+
+    fields = ("close", "volume")
+
+    def __init__(self):
+        super().__init__()
+        self._obv = 0.0
+        self._prev_close = math.nan
+
+    def _step(self, close, volume):
+        if close > self._prev_close:
+            self._obv += volume
+        elif close < self._prev_close:
+            self._obv -= volume
+        self._prev_close = close
+        return self._obv
+
+class StreamingIndicatorSet:
+    """
+    Bundle of streaming indicators updated together, one per compute_indicators key.
+
+    Args:
+        spec (dict, optional): Indicator name -> parameter overrides, in the same
+            format as src.tools.compute_indicators. Defaults to all indicators.
+    """
+
+    indicator_types = {
+        "macd": StreamingMACD,
+        "rsi": StreamingRSI,
+        "bollinger_bands": StreamingBollingerBands,
+        "obv": StreamingOBV,
+    }
+
+    def __init__(self, spec=None):
+        spec = spec if spec is not None else {name: {} for name in self.indicator_types}
+        unknown = set(spec) - set(self.indicator_types)
+        if unknown:
+            raise ValueError(f"Unknown indicators in spec: {sorted(unknown)}")
+        self.indicators = {
+            name: self.indicator_types[name](**(params or {}))
+            for name, params in spec.items()
+        }
+
+    def update(self, bar):
+        """Absorb one bar and return the latest value of every indicator."""
+        return {name: indicator.update(bar) for name, indicator in self.indicators.items()}
+
+    def update_many(self, bars):
+        """Absorb a batch of bars and return the per-bar values of every indicator."""
+        return {name: indicator.update_many(bars) for name, indicator in self.indicators.items()}
+
+    @property
+    def values(self):
+        return {name: indicator.value for name, indicator in self.indicators.items()}
+
+    @classmethod
+    def from_history(cls, prices_df, spec=None):
+        """Create an indicator set warm-started from a history DataFrame."""
+        indicator_set = cls(spec)
+        indicator_set.update_many(prices_df)
+        return indicator_set
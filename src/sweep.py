@@ -0,0 +1,150 @@
+import argparse
+import itertools
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from src.backtester import Backtester, DEFAULT_STRATEGY_PARAMS, LOOKBACK_DAYS
+from src.tools import get_price_data
+
+logger = logging.getLogger(__name__)
+
+# Price history shared by every task in a worker process, set once by _init_worker
+_worker_history = None
+
+def _init_worker(history):
+    global _worker_history
+    _worker_history = history
+
+def grid_configs(grid):
+    """Expand {param: [values]} into every combination."""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def random_configs(search_space, n_samples, seed=None):
+    """
+    Draw random configurations from a search space.
+
+    Args:
+        search_space (dict): Param -> list of choices, or (low, high) tuple sampled
+            uniformly (integers if both bounds are ints)
+        n_samples (int): Number of configurations to draw
+        seed (int, optional): Random seed for reproducible sweeps
+    """
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(n_samples):
+        config = {}
+        for name, space in search_space.items():
+            if isinstance(space, tuple):
+                low, high = space
+                if isinstance(low, int) and isinstance(high, int):
+                    config[name] = rng.randint(low, high)
+                else:
+                    config[name] = rng.uniform(low, high)
+            else:
+                config[name] = rng.choice(list(space))
+        configs.append(config)
+    return configs
+
+def _run_config(ticker, start_date, end_date, initial_capital, config):
+    backtester = Backtester(
+        agent=None,
+        ticker=ticker,
+        start_date=start_date,
+        end_date=end_date,
+        initial_capital=initial_capital,
+        strategy_params=config,
+        record_history=False
+    )
+    backtester.set_history(_worker_history)
+    backtester.run_vectorized_backtest()
+    return {**backtester.strategy_params, **backtester.metrics.summary()}
+
+def run_sweep(ticker, start_date, end_date, configs, initial_capital=100000, max_workers=None, history=None):
+    """
+    Run the vectorized backtest for every configuration across a process pool.
+
+    Prices are loaded once in the parent and handed to each worker when it
+    starts, so tasks only carry their parameter dict.
+
+    Args:
+        configs (list): Strategy parameter dicts (see DEFAULT_STRATEGY_PARAMS)
+        max_workers (int, optional): Pool size. Defaults to the number of CPUs.
+        history (pd.DataFrame, optional): Preloaded prices covering the range plus warm-up
+
+    Returns:
+        pd.DataFrame: One row per configuration with return, annualized Sharpe,
+            max drawdown, turnover and exposure, ranked by Sharpe ratio
+    """
+    unknown = {name for config in configs for name in config} - set(DEFAULT_STRATEGY_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown strategy parameters: {sorted(unknown)}")
+
+    if history is None:
+        warmup_start = (pd.Timestamp(start_date) - timedelta(days=LOOKBACK_DAYS)).strftime("%Y-%m-%d")
+        history = get_price_data(ticker, warmup_start, end_date)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    logger.info(f"Running {len(configs)} backtest configurations on {max_workers} workers")
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(history,)) as executor:
+        futures = [
+            executor.submit(_run_config, ticker, start_date, end_date, initial_capital, config)
+            for config in configs
+        ]
+        rows = [future.result() for future in futures]
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    return results.sort_values("sharpe_ratio", ascending=False).reset_index(drop=True)
+
+def _parse_value(text):
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            continue
+    return None if text.lower() == "none" else text
+
+def _parse_param(text):
+    """Parse 'name=v1,v2,...' (choices) or 'name=low:high' (random range)."""
+    name, _, values = text.partition("=")
+    if ":" in values:
+        low, high = values.split(":", 1)
+        return name, (_parse_value(low), _parse_value(high))
+    return name, [_parse_value(v) for v in values.split(",")]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run a parallel parameter sweep of the vectorized backtest')
+    parser.add_argument('--ticker', type=str, required=True, help='Stock ticker symbol (e.g., AAPL)')
+    parser.add_argument('--end_date', type=str, default=datetime.now().strftime('%Y-%m-%d'), help='End date in YYYY-MM-DD format')
+    parser.add_argument('--start_date', type=str, default=(datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d'), help='Start date in YYYY-MM-DD format')
+    parser.add_argument('--initial_capital', type=float, default=100000, help='Initial capital amount (default: 100000)')
+    parser.add_argument('--param', action='append', default=[], help="Parameter values, e.g. rsi_period=10,14,21 or stop_loss=0.01:0.05 (random search only)")
+    parser.add_argument('--samples', type=int, help='Draw this many random configurations instead of the full grid')
+    parser.add_argument('--seed', type=int, help='Random seed for --samples')
+    parser.add_argument('--workers', type=int, help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--output', type=str, help='Write the ranked results to this CSV file')
+
+    args = parser.parse_args()
+
+    space = dict(_parse_param(p) for p in args.param)
+    if args.samples:
+        configs = random_configs(space, args.samples, args.seed)
+    else:
+        if any(isinstance(v, tuple) for v in space.values()):
+            parser.error("Ranges (low:high) require --samples")
+        configs = grid_configs(space) if space else [{}]
+
+    results = run_sweep(
+        args.ticker, args.start_date, args.end_date, configs,
+        initial_capital=args.initial_capital, max_workers=args.workers
+    )
+    print(results.to_string())
+    if args.output:
+        results.to_csv(args.output, index=False)
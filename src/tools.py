@@ -1,6 +1,8 @@
 import os
 from dotenv import load_dotenv
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 from alpaca.data import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
@@ -8,6 +10,7 @@ from alpaca.data.timeframe import TimeFrame
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import MarketOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
+from src.bar_store import BarStore
 
 # Load environment variables
 load_dotenv()
@@ -17,12 +20,14 @@ ALPACA_API_KEY = os.getenv('ALPACA_API_KEY')
 ALPACA_SECRET_KEY = os.getenv('ALPACA_SECRET_KEY')
 ALPACA_PAPER_ENDPOINT = os.getenv('ALPACA_PAPER_ENDPOINT', "https://paper-api.alpaca.markets")
 ALPACA_LIVE_ENDPOINT = os.getenv('ALPACA_LIVE_ENDPOINT', "https://api.alpaca.markets")
+# Optional market data base URL, e.g. the local stand-in from src.market_data_server
+ALPACA_DATA_URL = os.getenv('ALPACA_DATA_URL')
 
 if not ALPACA_API_KEY or not ALPACA_SECRET_KEY:
     raise ValueError("Alpaca API credentials not found in environment variables")
 
 # Initialize clients
-data_client = StockHistoricalDataClient(ALPACA_API_KEY, ALPACA_SECRET_KEY)
+data_client = StockHistoricalDataClient(ALPACA_API_KEY, ALPACA_SECRET_KEY, url_override=ALPACA_DATA_URL)
 paper_trading_client = TradingClient(ALPACA_API_KEY, ALPACA_SECRET_KEY, paper=True)
 live_trading_client = TradingClient(ALPACA_API_KEY, ALPACA_SECRET_KEY, paper=False)
 
@@ -30,17 +35,28 @@ def get_trading_client(paper=True):
     """Get the appropriate trading client based on paper/live mode."""
     return paper_trading_client if paper else live_trading_client
 
-def get_prices(ticker, start_date, end_date):
-    """Fetch price data from Alpaca."""
+def _fetch_bars(ticker, start, end, timeframe=TimeFrame.Day):
+    """Fetch bars for one ticker and datetime range directly from Alpaca."""
     request_params = StockBarsRequest(
         symbol_or_symbols=[ticker],
-        timeframe=TimeFrame.Day,
-        start=datetime.strptime(start_date, "%Y-%m-%d"),
-        end=datetime.strptime(end_date, "%Y-%m-%d")
+        timeframe=timeframe,
+        start=start,
+        end=end
     )
-    
-    bars = data_client.get_stock_bars(request_params)
-    df = bars.df
+    return data_client.get_stock_bars(request_params).df
+
+# Local bar cache; ranges already downloaded are served from disk
+bar_store = BarStore(fetch=_fetch_bars)
+
+def get_prices(ticker, start_date, end_date, use_cache=True):
+    """Fetch price data from Alpaca, serving previously downloaded ranges from the local bar store."""
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+
+    if use_cache:
+        df = bar_store.get_bars(ticker, start, end, TimeFrame.Day)
+    else:
+        df = _fetch_bars(ticker, start, end)
     
     if len(df) == 0:
         raise ValueError(f"No price data returned for {ticker}")
@@ -58,6 +74,43 @@ def get_price_data(ticker, start_date, end_date):
     prices = get_prices(ticker, start_date, end_date)
     return prices_to_df(prices)
 
+def get_prices_panel(tickers, start_date, end_date):
+    """Fetch price data for several tickers from Alpaca in a single request."""
+    request_params = StockBarsRequest(
+        symbol_or_symbols=list(tickers),
+        timeframe=TimeFrame.Day,
+        start=datetime.strptime(start_date, "%Y-%m-%d"),
+        end=datetime.strptime(end_date, "%Y-%m-%d")
+    )
+
+    bars = data_client.get_stock_bars(request_params)
+    df = bars.df
+
+    if len(df) == 0:
+        raise ValueError(f"No price data returned for {', '.join(tickers)}")
+
+    return df
+
+def prices_to_panel(prices_df, fields=("close", "volume")):
+    """
+    Pivot Alpaca's (symbol, timestamp) MultiIndex bars into a symbols x time panel.
+
+    Args:
+        prices_df (pd.DataFrame): Multi-symbol bars as returned by get_prices_panel
+        fields (tuple): Bar columns to pivot
+
+    Returns:
+        dict: Field name -> DataFrame indexed by symbol with one column per
+            timestamp. Bars missing for a symbol are NaN.
+    """
+    df = prices_df.copy()
+    df.columns = [c.lower() for c in df.columns]
+    return {field: df[field].unstack(level=-1).sort_index(axis=1) for field in fields}
+
+def get_price_panel(tickers, start_date, end_date, fields=("close", "volume")):
+    prices = get_prices_panel(tickers, start_date, end_date)
+    return prices_to_panel(prices, fields)
+
 def calculate_confidence_level(signals):
     """Calculate confidence level based on the difference between SMAs."""
     sma_diff_prev = abs(signals['sma_5_prev'] - signals['sma_20_prev'])
@@ -92,16 +145,173 @@ def calculate_bollinger_bands(prices_df, window=20):
     return upper_band, lower_band
 
 def calculate_obv(prices_df):
-    obv = [0]
-    for i in range(1, len(prices_df)):
-        if prices_df['close'].iloc[i] > prices_df['close'].iloc[i - 1]:
-            obv.append(obv[-1] + prices_df['volume'].iloc[i])
-        elif prices_df['close'].iloc[i] < prices_df['close'].iloc[i - 1]:
-            obv.append(obv[-1] - prices_df['volume'].iloc[i])
+    """Calculate On-Balance Volume without modifying the input frame."""
+    close = prices_df['close'].to_numpy(dtype=float)
+    obv = _obv(close, _diff(close), prices_df['volume'].to_numpy(dtype=float))
+    return pd.Series(obv, index=prices_df.index, name='OBV')
+
+# Default parameters for compute_indicators, matching the calculate_* functions above
+DEFAULT_INDICATOR_SPEC = {
+    "macd": {"fast": 12, "slow": 26, "signal": 9},
+    "rsi": {"period": 14},
+    "bollinger_bands": {"window": 20, "num_std": 2},
+    "obv": {},
+}
+
+def _diff(values):
+    """First difference along the last axis, NaN in the first position (like Series.diff)."""
+    delta = np.empty_like(values)
+    if values.shape[-1] == 0:
+        return delta
+    delta[..., 0] = np.nan
+    np.subtract(values[..., 1:], values[..., :-1], out=delta[..., 1:])
+    return delta
+
+def _ema(values, span):
+    """EMA along the last axis, equivalent to ewm(span=span, adjust=False).mean()."""
+    frame = pd.DataFrame(np.atleast_2d(values).T)
+    ema = frame.ewm(span=span, adjust=False).mean().to_numpy().T
+    return ema.reshape(values.shape)
+
+def _rolling_windows(values, window):
+    """Strided (zero-copy) view of trailing windows along the last axis."""
+    return sliding_window_view(values, window, axis=-1)
+
+def _pad_windowed(result, window):
+    """Left-pad a windowed result with NaN so it lines up with the input."""
+    pad = np.full(result.shape[:-1] + (window - 1,), np.nan)
+    return np.concatenate([pad, result], axis=-1)
+
+def _rolling_mean(values, window):
+    if values.shape[-1] < window:
+        return np.full(values.shape, np.nan)
+    return _pad_windowed(_rolling_windows(values, window).mean(axis=-1), window)
+
+def _rolling_mean_std(values, window):
+    """Rolling mean and sample std (ddof=1) sharing a single window view."""
+    if values.shape[-1] < window:
+        empty = np.full(values.shape, np.nan)
+        return empty, empty.copy()
+    windows = _rolling_windows(values, window)
+    mean = windows.mean(axis=-1)
+    std = np.sqrt(((windows - mean[..., None]) ** 2).sum(axis=-1) / (window - 1))
+    return _pad_windowed(mean, window), _pad_windowed(std, window)
+
+def _rsi(delta, period):
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _rolling_mean(gain, period)
+    avg_loss = _rolling_mean(loss, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        return 100 - (100 / (1 + rs))
+
+def _obv(close, delta, volume):
+    direction = np.where(delta > 0, 1.0, np.where(delta < 0, -1.0, 0.0))
+    # A missing bar adds nothing instead of turning the rest of the running total into NaN
+    obv = np.cumsum(np.nan_to_num(direction * volume), axis=-1)
+    obv[np.isnan(close)] = np.nan
+    return obv
+
+def _compute_indicator_arrays(close, volume, spec):
+    """
+    Compute indicators over raw arrays (time on the last axis).
+
+    Intermediate results such as the close-to-close difference are computed
+    once and shared between RSI and OBV.
+    """
+    unknown = set(spec) - set(DEFAULT_INDICATOR_SPEC)
+    if unknown:
+        raise ValueError(f"Unknown indicators in spec: {sorted(unknown)}")
+
+    results = {}
+    delta = _diff(close) if ("rsi" in spec or "obv" in spec) else None
+
+    if "macd" in spec:
+        params = {**DEFAULT_INDICATOR_SPEC["macd"], **(spec["macd"] or {})}
+        macd_line = _ema(close, params["fast"]) - _ema(close, params["slow"])
+        results["macd"] = (macd_line, _ema(macd_line, params["signal"]))
+
+    if "rsi" in spec:
+        params = {**DEFAULT_INDICATOR_SPEC["rsi"], **(spec["rsi"] or {})}
+        results["rsi"] = _rsi(delta, params["period"])
+
+    if "bollinger_bands" in spec:
+        params = {**DEFAULT_INDICATOR_SPEC["bollinger_bands"], **(spec["bollinger_bands"] or {})}
+        sma, std_dev = _rolling_mean_std(close, params["window"])
+        results["bollinger_bands"] = (sma + std_dev * params["num_std"],
+                                      sma - std_dev * params["num_std"])
+
+    if "obv" in spec:
+        if volume is None:
+            raise ValueError("OBV requires volume data")
+        results["obv"] = _obv(close, delta, volume)
+
+    return results
+
+def compute_indicators(prices_df, spec=None):
+    """
+    Compute several technical indicators in one pass over the close/volume arrays.
+
+    Args:
+        prices_df (pd.DataFrame): Price data with 'close' (and 'volume' for OBV) columns
+        spec (dict, optional): Indicator name -> parameter overrides. Defaults to
+            DEFAULT_INDICATOR_SPEC (MACD, RSI, Bollinger Bands and OBV).
+
+    Returns:
+        dict: Results shaped like the matching calculate_* functions:
+            'macd' -> (macd_line, signal_line), 'rsi' -> rsi,
+            'bollinger_bands' -> (upper_band, lower_band), 'obv' -> obv.
+            The input frame is never modified.
+    """
+    spec = DEFAULT_INDICATOR_SPEC if spec is None else spec
+    close = prices_df['close'].to_numpy(dtype=float)
+    volume = prices_df['volume'].to_numpy(dtype=float) if 'volume' in prices_df else None
+
+    arrays = _compute_indicator_arrays(close, volume, spec)
+
+    index = prices_df.index
+    results = {}
+    for name, value in arrays.items():
+        if isinstance(value, tuple):
+            results[name] = tuple(pd.Series(v, index=index, name='close') for v in value)
         else:
-            obv.append(obv[-1])
-    prices_df['OBV'] = obv
-    return prices_df['OBV']
+            results[name] = pd.Series(value, index=index, name='OBV' if name == 'obv' else 'close')
+    return results
+
+def compute_panel_indicators(panel, spec=None):
+    """
+    Compute indicators for every symbol of a panel at once.
+
+    The indicators run over 2-D (symbols x time) arrays, so there is no
+    per-symbol Python loop. Where a symbol has no bar the indicators are NaN
+    and the windows around it are NaN too; OBV skips the missing bar and
+    carries its running total on.
+
+    Args:
+        panel (dict): Output of prices_to_panel ('close' and, for OBV, 'volume')
+        spec (dict, optional): Same format as compute_indicators
+
+    Returns:
+        dict: Same keys and tuple shapes as compute_indicators, with
+            symbols x time DataFrames in place of Series.
+    """
+    spec = DEFAULT_INDICATOR_SPEC if spec is None else spec
+    close_df = panel['close']
+    close = close_df.to_numpy(dtype=float)
+    volume = None
+    if 'volume' in panel:
+        volume = panel['volume'].reindex(index=close_df.index, columns=close_df.columns).to_numpy(dtype=float)
+
+    arrays = _compute_indicator_arrays(close, volume, spec)
+
+    def to_frame(values):
+        return pd.DataFrame(values, index=close_df.index, columns=close_df.columns)
+
+    return {
+        name: tuple(to_frame(v) for v in value) if isinstance(value, tuple) else to_frame(value)
+        for name, value in arrays.items()
+    }
 
 def execute_trade(ticker, action, quantity, paper=True, current_price=None):
     """Execute a trade using Alpaca."""
@@ -1,29 +1,92 @@
 import asyncio
 import logging
-from typing import Dict, List
+import multiprocessing
+from typing import Dict, Iterable, List, Optional
 from src.base_agent import BaseAgent
 from src.agents import MarketDataAgent, QuantitativeAgent, RiskManagementAgent, PortfolioManagementAgent
+from src.bus_transport import BusHub, LocalTransport, SocketTransport
 from src.message_bus import message_bus
+from src.scheduler import TimerScheduler
+from src import offload
 from src.user_profile import UserProfileManager
 
 logger = logging.getLogger(__name__)
 
+AGENT_CLASSES = {
+    "market_data": MarketDataAgent,
+    "quantitative": QuantitativeAgent,
+    "risk_management": RiskManagementAgent,
+    "portfolio_management": PortfolioManagementAgent
+}
+
+# Seconds to wait for agent processes to exit before terminating them
+PROCESS_STOP_TIMEOUT = 10
+
+# Journaled message types that rebuild agent state on a warm restart
+RESTORE_MESSAGE_TYPES = ("market_data", "technical_analysis", "risk_assessment")
+
+def run_agent_process(agent_key: str, user_name: str, bus_address: str):
+    """Entry point of an agent worker process: run one agent on a bus connected to the hub."""
+    asyncio.run(_agent_process_main(agent_key, user_name, bus_address))
+
+async def _agent_process_main(agent_key: str, user_name: str, bus_address: str):
+    stop_requested = asyncio.Event()
+
+    async def handle_control(message: dict):
+        content = message.get("content")
+        if isinstance(content, dict) and content.get("command") == "stop":
+            stop_requested.set()
+
+    # Daemonic worker processes cannot start a process pool of their own
+    offload.configure(compute_pool="thread")
+    await message_bus.use_transport(SocketTransport(bus_address))
+    bus_task = asyncio.create_task(message_bus.start())
+    agent = AGENT_CLASSES[agent_key](user_name=user_name)
+    await message_bus.subscribe(handle_control, agent.agent_type, message_types=["system_control"])
+    try:
+        await agent.start()
+        logger.info(f"{agent_key} agent running in worker process")
+        await stop_requested.wait()
+        await agent.stop()
+    finally:
+        await message_bus.stop()
+        bus_task.cancel()
+
 class TradingSystem:
-    def __init__(self, user_name=None):
+    def __init__(self, user_name=None, clock=None, multiprocess=False, bus_address=None,
+                 restore_types: Optional[Iterable[str]] = None):
         """
         Initialize the trading system with optional user name
         
         Args:
             user_name (str, optional): Name of the user interacting with the system
+            clock (Clock, optional): Time source shared by all agents
+            multiprocess (bool, optional): Run each agent in its own worker process,
+                connected to this process's message bus through a BusHub
+            bus_address (str, optional): Unix socket path or "host:port" for the hub
+                in multiprocess mode. Defaults to a per-process socket.
+            restore_types (Iterable[str], optional): Message types replayed from the
+                bus journal into the agents on the first start, so they resume with
+                their previous state. Needs message_bus.journal; not supported in
+                multiprocess mode. Defaults to no restore.
         """
         # Use provided user_name or fetch from profile
         self.user_name = user_name or UserProfileManager.get_user_name()
+        self.multiprocess = multiprocess
+        self.bus_address = bus_address
+        self.restore_types = restore_types
+        self._restored = False
+        self._hub = None
+        self.processes: Dict[str, multiprocessing.Process] = {}
+        # One timer driver wakes every agent's periodic work
+        self.scheduler = TimerScheduler(clock)
+        # Reports how long agent work blocks the event loop
+        self.loop_monitor = offload.LoopMonitor()
         
-        self.agents: Dict[str, BaseAgent] = {
-            "market_data": MarketDataAgent(user_name=self.user_name),
-            "quantitative": QuantitativeAgent(user_name=self.user_name),
-            "risk_management": RiskManagementAgent(user_name=self.user_name),
-            "portfolio_management": PortfolioManagementAgent(user_name=self.user_name)
+        # In multiprocess mode the agents only exist in their worker processes
+        self.agents: Dict[str, BaseAgent] = {} if multiprocess else {
+            key: agent_class(user_name=self.user_name, clock=clock, scheduler=self.scheduler)
+            for key, agent_class in AGENT_CLASSES.items()
         }
         self._running = False
         logger.info(f"Trading system initialized for user: {self.user_name}")
@@ -48,6 +111,10 @@ class TradingSystem:
 
         self._running = True
         logger.info(f"Starting trading system for {self.user_name}")
+
+        self.loop_monitor.start()
+        if self.multiprocess:
+            await self._start_processes()
         
         # Start each agent
         for agent_type, agent in self.agents.items():
@@ -58,6 +125,10 @@ class TradingSystem:
                 logger.error(f"Error starting {agent_type} agent: {e}")
                 continue
 
+        # Agents are subscribed now, so the journaled messages reach them
+        if self.restore_types and not self._restored:
+            await self._restore_from_journal()
+
         # Announce system start
         await message_bus.publish(
             sender="system",
@@ -83,6 +154,13 @@ class TradingSystem:
             except Exception as e:
                 logger.error(f"Error stopping {agent_type} agent: {e}")
 
+        self.scheduler.stop()
+        self.loop_monitor.stop()
+        logger.info(f"Event loop stats: {self.loop_monitor.stats()}")
+
+        if self.multiprocess:
+            await self._stop_processes()
+
         # Announce system stop
         await message_bus.publish(
             sender="system",
@@ -90,3 +168,58 @@ class TradingSystem:
             content="Trading system stopped. All agents are offline.",
             private=False
         )
+
+    async def _restore_from_journal(self):
+        """Replay restore_types from the bus journal into the agents (once per process)."""
+        self._restored = True
+        if message_bus.journal is None:
+            logger.warning("Journal restore requested but the message bus has no journal")
+            return
+        if self.multiprocess:
+            logger.warning("Journal restore only reaches in-process agents; skipped in multiprocess mode")
+            return
+        try:
+            count = await message_bus.restore(message_types=self.restore_types)
+            logger.info(f"Restored agent state from {count} journaled messages")
+        except Exception as e:
+            logger.error(f"Error restoring from the message journal: {e}")
+
+    async def _start_processes(self):
+        """Start the hub, connect the local bus to it and spawn one worker process per agent."""
+        self._hub = BusHub(self.bus_address)
+        address = await self._hub.start()
+        await message_bus.use_transport(SocketTransport(address))
+
+        context = multiprocessing.get_context("spawn")
+        for agent_type in AGENT_CLASSES:
+            try:
+                process = context.Process(
+                    target=run_agent_process,
+                    args=(agent_type, self.user_name, address),
+                    name=f"{agent_type}-agent",
+                    daemon=True
+                )
+                process.start()
+                self.processes[agent_type] = process
+                logger.info(f"Started {agent_type} agent process (pid {process.pid})")
+            except Exception as e:
+                logger.error(f"Error starting {agent_type} agent process: {e}")
+
+    async def _stop_processes(self):
+        """Ask the worker processes to stop, then disconnect the local bus from the hub."""
+        await message_bus.publish(
+            sender="system",
+            message_type="system_control",
+            content={"command": "stop"},
+            private=False
+        )
+        for agent_type, process in self.processes.items():
+            await asyncio.to_thread(process.join, PROCESS_STOP_TIMEOUT)
+            if process.is_alive():
+                logger.warning(f"{agent_type} agent process did not stop, terminating")
+                process.terminate()
+        self.processes = {}
+
+        await message_bus.use_transport(LocalTransport())
+        await self._hub.stop()
+        self._hub = None